@@ -0,0 +1,36 @@
+"""
+Сборка DATABASES из DATABASE_URL / REPLICA_DATABASE_URL (dj-database-url).
+"""
+
+import os
+from pathlib import Path
+
+import dj_database_url
+
+# SQLite: WAL — читатели не ждут писателя; busy timeout — писатели ждут
+# блокировку файла, а не падают с "database is locked"; IMMEDIATE — транзакция
+# сразу берёт блокировку записи и не получает её отказ посреди работы.
+SQLITE_OPTIONS = {
+    'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),  # секунд
+}
+
+
+def database_config(url, base_dir, conn_max_age=0, pool=False):
+    """
+    conn_max_age — сколько секунд держать соединение между запросами (0 — закрывать).
+    pool=True — пул соединений psycopg 3 (Django 5.1+); постоянные соединения
+    с пулом несовместимы, поэтому CONN_MAX_AGE тогда 0.
+    """
+    config = dj_database_url.parse(url, conn_max_age=conn_max_age, conn_health_checks=conn_max_age > 0)
+    options = config.setdefault('OPTIONS', {})
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        # относительный путь считаем от корня проекта, а не от текущего каталога
+        if config['NAME'] != ':memory:':
+            config['NAME'] = str(Path(base_dir) / config['NAME'])
+        options.update(SQLITE_OPTIONS)
+    elif config['ENGINE'] == 'django.db.backends.postgresql' and pool:
+        options['pool'] = True
+        config['CONN_MAX_AGE'] = 0
+    return config
@@ -31,7 +31,6 @@ INSTALLED_APPS = [
 ]
 
 # ── CLOUDINARY ──
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME'),
     'API_KEY': os.environ.get('CLOUDINARY_API_KEY'),
@@ -45,8 +44,10 @@ CLOUDINARY_STORAGE = {
 
 # ── MIDDLEWARE ──
 MIDDLEWARE = [
+    'main.middleware.ServerTimingMiddleware',  # Server-Timing и лог времени запросов (main/perf.py)
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main.middleware.WhiteNoiseMiddleware',  # WhiteNoise с async-веткой для ASGI
+    'main.middleware.ReplicaReadsMiddleware',  # чтения каталога с реплики (main/db_router.py)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # 🔥 для смены языка
     'django.middleware.common.CommonMiddleware',
@@ -61,7 +62,7 @@ ROOT_URLCONF = 'folik.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'main.perf.TimedDjangoTemplates',  # DjangoTemplates + замер рендера для Server-Timing
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',  # 🔥 нужен для смены языка
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main.context_processors.cart',  # счётчик корзины в шапке
             ],
         },
     },
@@ -76,14 +78,135 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'folik.wsgi.application'
 
-# ── DATABASE (SQLite) ──
+# ── DATABASE ──
+# DATABASE_URL (Postgres на проде, см. DEPLOY.md), по умолчанию — локальный SQLite.
+# REPLICA_DATABASE_URL — реплика только для чтения: туда уходят чтения каталога
+# (main/db_router.py), заказы, корзина, сессии и админка — всегда в основную БД.
+from folik.database import database_config
+
+# по умолчанию соединение закрывается после запроса: под ASGI синхронный ORM
+# работает в потоках пула, и постоянные соединения копятся по одному на поток,
+# пока не упрутся в max_connections. Под WSGI можно включить (например 60),
+# под ASGI с Postgres лучше пул: DB_POOL=True
+CONN_MAX_AGE = int(os.environ.get('CONN_MAX_AGE', 0))
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'  # пул psycopg 3 вместо постоянных соединений
+
 DATABASES = {
+    'default': database_config(
+        os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3'), BASE_DIR, CONN_MAX_AGE, DB_POOL
+    ),
+}
+if os.environ.get('REPLICA_DATABASE_URL'):
+    DATABASES['replica'] = database_config(
+        os.environ['REPLICA_DATABASE_URL'], BASE_DIR, CONN_MAX_AGE, DB_POOL
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['main.db_router.PrimaryReplicaRouter']
+
+# ── CACHE ──
+# по умолчанию память процесса; при нескольких воркерах gunicorn задайте общий бэкенд,
+# например CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/folik-cache
+# С LocMem у каждого процесса свой кеш: версия каталога (main/caching.py) всё равно
+# общая — она в БД, — но изменение доходит до процесса только через CATALOG_VERSION_TTL.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'folik'),
+        'TIMEOUT': 600,
     }
 }
 
+# как долго процесс доверяет копии версии каталога в кеше, прежде чем перечитать её из БД (сек)
+CATALOG_VERSION_TTL = int(os.environ.get('CATALOG_VERSION_TTL', 5))
+
+# кеш целых страниц каталога для анонимных посетителей (main.caching.cache_anonymous_page)
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'False') == 'True'
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 300))
+CART_COUNT_COOKIE = 'cart_count'  # счётчик товаров в корзине, часть ключа кеша страниц
+
+# ── CART ──
+# 'db' — CartItem в БД по session_key; 'cookie' — подписанная cookie, БД только при заказе
+CART_BACKEND = os.environ.get('CART_BACKEND', 'db')
+CART_COOKIE_NAME = 'cart'
+
+# ── CATALOG ──
+CATALOG_PAGE_SIZE = int(os.environ.get('CATALOG_PAGE_SIZE', 24))  # товаров на страницу /products/
+SEARCH_RESULTS_LIMIT = 96  # сколько лучших совпадений показывать по ?q=
+
+# веса рейтинга featured_score (команда rank_products, main/ranking.py)
+RANKING = {
+    'window_days': 30,          # окно, за которое считаются продажи
+    'sales': 4.0,               # × log(1 + продаж в месяц)
+    'stock': 1.0,               # × min(остаток, stock_cap) / stock_cap
+    'stock_cap': 10,
+    'discount': 2.0,            # × глубина скидки, 0..1
+    'recency': 1.0,             # × 0.5 ** (возраст в днях / recency_half_life)
+    'recency_half_life': 30,
+    'featured_boost': 5.0,      # ручная отметка is_featured в админке
+}
+
+# похожие товары (команда rebuild_similar_products, main/similarity.py): веса характеристик
+# в расстоянии между товарами; price — за разницу цен в разах (ln), остальные шкалы 0..1
+SIMILARITY = {
+    'neighbours': 8,            # сколько соседей хранить на товар
+    'ram': 1.0,
+    'storage': 0.6,
+    'storage_type': 0.3,        # SSD / HDD
+    'cpu': 1.5,                 # уровень процессора, main.similarity.cpu_tier
+    'gpu': 1.0,                 # уровень видеокарты, main.similarity.gpu_tier
+    'condition': 0.4,           # новый / восстановленный / б/у
+    'price': 1.0,
+}
+
+# "Разом купують" (команда update_bought_together, main/copurchase.py)
+BOUGHT_TOGETHER_MIN_COUNT = 2  # пара встречается хотя бы в стольких заказах
+BOUGHT_TOGETHER_SHOWN = 4
+
+# ── ФОНОВЫЕ ЗАДАЧИ И ПОЧТА ──
+# очередь Job (main/jobs.py, воркер run_jobs): после заказа — письмо на эти адреса
+ORDER_NOTIFY_EMAILS = [email.strip() for email in os.environ.get('ORDER_NOTIFY_EMAILS', '').split(',') if email.strip()]
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Folik <noreply@folik.local>')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+
+# ── FEEDS ──
+# выгрузка каталога для агрегаторов и маркетплейсов: /feed.xml, /feed.csv (main/feeds.py)
+SITE_URL = os.environ.get('SITE_URL', 'https://folik.onrender.com')
+FEED_CURRENCY = 'UAH'
+FEED_ROOT = BASE_DIR / 'feeds'  # готовые файлы фидов, имя содержит версию каталога
+FEED_CHUNK_SIZE = 500  # товаров на чанк выборки (и на prefetch фото)
+
+# ── PERFORMANCE ──
+# доля запросов, которые замеряются (0 — выключено, 1 — все): заголовок Server-Timing
+# и JSON-строка в лог main.perf; медленнее PERF_SLOW_REQUEST_MS — ещё и SQL в main.perf.slow
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', 0))
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', 1000))
+PERF_LOG_FILE = os.environ.get('PERF_LOG_FILE')  # JSON lines; без него — в консоль
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'perf': {
+            'class': 'logging.FileHandler' if PERF_LOG_FILE else 'logging.StreamHandler',
+            'formatter': 'message',
+            **({'filename': PERF_LOG_FILE} if PERF_LOG_FILE else {}),
+        },
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'main.perf': {'handlers': ['perf'], 'level': 'INFO', 'propagate': False},
+        'main.jobs': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # ── PASSWORD VALIDATION ──
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -113,10 +236,27 @@ LOCALE_PATHS = [
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# CSS/JS страниц (main/static/main/) после collectstatic получают хеш в имени и .gz/.br
+# копии; WhiteNoise отдаёт такие файлы с Cache-Control на год (immutable).
+# Django 5.1+ читает только STORAGES — STATICFILES_STORAGE / DEFAULT_FILE_STORAGE не действуют.
+STORAGES = {
+    # media загружается на Cloudinary; без него — обычные файлы в MEDIA_ROOT
+    'default': {
+        'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage'
+        if CLOUDINARY_STORAGE['CLOUD_NAME'] else 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # ── MEDIA FILES ──
-# media загружается на Cloudinary через DEFAULT_FILE_STORAGE
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# без Cloudinary картинки отдаются из MEDIA_ROOT, а уменьшенные копии
+# заранее готовит команда build_image_variants (каталог внутри MEDIA_ROOT)
+LOCAL_IMAGES = not CLOUDINARY_STORAGE['CLOUD_NAME']
+IMAGE_VARIANTS_DIR = 'variants'
 
 # ── DEFAULT AUTO FIELD ──
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,6 +1,12 @@
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Product, ProductImage, Order, OrderItem, CartItem
+from .catalog_import import CatalogImportError, import_catalog
+from .models import Product, ProductImage, Order, OrderItem, CartItem, Job
 
 # Русские заголовки админки
 admin.site.site_header = "Панель управления Folik"
@@ -22,12 +28,18 @@ class ProductImageInline(admin.TabularInline):
     image_preview.short_description = "Превью"
 
 
+class ProductImportForm(forms.Form):
+    file = forms.FileField(label='Файл CSV или XLSX')
+    dry_run = forms.BooleanField(label='Только проверить, ничего не записывать', required=False)
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('title', 'brand', 'model_name', 'price', 'stock', 'is_available', 'is_featured', 'featured_score', 'created_at', 'main_image_preview')
     list_filter = ('is_available', 'is_featured', 'brand', 'condition', 'created_at')
     search_fields = ('title', 'brand', 'model_name', 'sku')
-    list_editable = ('is_available', 'is_featured', 'featured_score')
+    # featured_score пересчитывает rank_products (main/ranking.py); вручную — только is_featured
+    list_editable = ('is_available', 'is_featured')
     prepopulated_fields = { 'slug': ('title',) }
     inlines = [ProductImageInline]
 
@@ -37,6 +49,35 @@ class ProductAdmin(admin.ModelAdmin):
         return "-"
     main_image_preview.short_description = "Главная фото"
 
+    # импорт прайса из CSV/XLSX (см. main/catalog_import.py); кнопка — в change_list.html
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='main_product_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        report = None
+        form = ProductImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = import_catalog(upload, upload.name, dry_run=form.cleaned_data['dry_run'])
+            except CatalogImportError as exc:
+                form.add_error('file', str(exc))
+
+        return TemplateResponse(request, 'admin/main/product/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт товаров',
+            'form': form,
+            'report': report,
+            'errors': report.errors[:500] if report else [],
+        })
+
+
 
 # --------------------
 # КОРЗИНА (через сессии, без юзеров)
@@ -56,11 +97,11 @@ class CartItemAdmin(admin.ModelAdmin):
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ('product', 'quantity', 'total_price')
+    readonly_fields = ('product', 'quantity', 'price', 'total_price')
 
     def total_price(self, obj):
-        # Безопасно считаем сумму, если product удалён
-        return obj.get_total_price() if obj.product else 0
+        # Безопасно считаем сумму, если product удалён (цена уже сохранена в позиции)
+        return obj.get_total_price() if obj.price is not None or obj.product else 0
     total_price.short_description = 'Сумма'
 
 
@@ -72,17 +113,13 @@ class OrderAdmin(admin.ModelAdmin):
         'phone',
         'created_at',
         'is_processed',
-        'order_total'
+        'item_count',
+        'total'
     )
     list_filter = ('is_processed', 'created_at')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'item_count', 'total')
     inlines = [OrderItemInline]
 
-    def order_total(self, obj):
-        # Суммируем только существующие продукты
-        return sum(item.get_total_price() for item in obj.items.all() if item.product)
-    order_total.short_description = 'Итого'
-
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -90,5 +127,23 @@ class OrderItemAdmin(admin.ModelAdmin):
 
     def get_total_price(self, obj):
         # Безопасно, если продукт удалён
-        return obj.get_total_price() if obj.product else 0
+        return obj.get_total_price() if obj.price is not None or obj.product else 0
     get_total_price.short_description = 'Сумма'
+
+
+# --------------------
+# ФОНОВЫЕ ЗАДАЧИ (очередь main/jobs.py)
+# --------------------
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'finished_at', 'last_error')
+    actions = ['retry']
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.DONE).update(
+            status=Job.PENDING, attempts=0, run_at=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f'Поставлено в очередь заново: {updated}')
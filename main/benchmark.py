@@ -0,0 +1,507 @@
+import json
+import random
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from . import copurchase, perf, ranking
+from .caching import bump_catalog_version
+from .facets import rebuild_facet_counts
+from .models import (
+    CartItem, FacetCount, JobWatermark, Order, OrderItem, Product, ProductImage, ProductPair, ProductVector,
+    SimilarProduct,
+)
+from .search import rebuild_search_index
+from .urls import urlpatterns
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# =====================
+# ТЕСТОВЫЕ ДАННЫЕ ДЛЯ БЕНЧМАРКА
+# =====================
+# Детерминированный (seed) генератор каталога, фото, корзин и истории заказов
+# за год. Всё пишется bulk_create пачками по BATCH_SIZE, сигналы не срабатывают,
+# поэтому фасеты, поисковый индекс и версия каталога пересчитываются в конце.
+# Сгенерированные строки помечены (sku BENCH-..., session_key bench..., заказчик
+# "Benchmark") и удаляются clear_benchmark_data без затрагивания остальных.
+BATCH_SIZE = 5000
+SKU_PREFIX = 'BENCH-'
+SESSION_PREFIX = 'bench'
+CUSTOMER = 'Benchmark'
+
+BRANDS = ['Lenovo', 'HP', 'Dell', 'Asus', 'Acer', 'Apple', 'MSI', 'Fujitsu']
+CPUS = ['Intel Core i3-8130U', 'Intel Core i5-8250U', 'Intel Core i5-10210U', 'Intel Core i7-8650U',
+        'Intel Core i7-1165G7', 'AMD Ryzen 5 3500U', 'AMD Ryzen 7 4700U', 'Apple M1']
+GPUS = ['Intel UHD 620', 'Intel Iris Xe', 'AMD Radeon Vega 8', 'NVIDIA GeForce MX250',
+        'NVIDIA GeForce GTX 1650', 'NVIDIA GeForce RTX 3050', None]
+SYSTEMS = ['Windows 10 Pro', 'Windows 11 Pro', 'macOS', 'Ubuntu', None]
+CONDITIONS = ['new', 'used', 'refurbished']
+RAM = [4, 8, 8, 16, 16, 32]
+STORAGE = [128, 256, 256, 512, 1024]
+
+
+class BenchmarkData:
+    def __init__(self):
+        self.products = 0
+        self.images = 0
+        self.cart_items = 0
+        self.orders = 0
+        self.order_items = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _batches(items, size=BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _product(rng, number):
+    brand = rng.choice(BRANDS)
+    model_name = f'{rng.choice(["ThinkPad", "EliteBook", "Latitude", "ZenBook", "Swift", "Book"])} {number % 997}'
+    price = Decimal(rng.randrange(3000, 80000, 50))
+    return Product(
+        title=f'{brand} {model_name}',
+        brand=brand,
+        model_name=model_name,
+        sku=f'{SKU_PREFIX}{number:07d}',
+        slug=f'bench-{number}',
+        cpu=rng.choice(CPUS),
+        ram_gb=rng.choice(RAM),
+        storage_gb=rng.choice(STORAGE),
+        storage_type=rng.choice(['SSD', 'SSD', 'HDD']),
+        gpu=rng.choice(GPUS),
+        operating_system=rng.choice(SYSTEMS),
+        condition=rng.choice(CONDITIONS),
+        description='Тестовый товар для бенчмарка.',
+        price=price,
+        discount_price=(price * Decimal('0.9')).quantize(Decimal('1')) if rng.random() < 0.2 else None,
+        warranty_months=rng.choice([0, 3, 6, 12]),
+        image=f'bench/{number}',
+        is_available=rng.random() < 0.9,
+        stock=rng.randrange(0, 50),
+        is_featured=rng.random() < 0.01,
+    )
+
+
+def _create_products(rng, count, images_per_product, now, data):
+    """Возвращает {id: цена продажи} созданных товаров — для позиций заказов."""
+    prices = {}
+    for batch in _batches(_product(rng, number) for number in range(1, count + 1)):
+        created = Product.objects.bulk_create(batch)
+        ids = [product.pk for product in created]
+        # created_at — auto_now_add, разносим по году отдельным UPDATE на пачку
+        Product.objects.filter(pk__in=ids).update(created_at=now - timedelta(days=rng.randrange(365)))
+        ProductImage.objects.bulk_create(
+            [ProductImage(product_id=pk, image=f'bench/{pk}-{n}') for pk in ids for n in range(images_per_product)],
+            batch_size=BATCH_SIZE,
+        )
+        prices.update((product.pk, product.get_display_price()) for product in created)
+        data.products += len(ids)
+        data.images += len(ids) * images_per_product
+    return prices
+
+
+def _create_cart_items(rng, product_ids, count, data):
+    def rows():
+        session = 0
+        remaining = count
+        while remaining > 0:
+            # одна строка на (сессия, товар), как в настоящей корзине
+            lines = min(rng.randint(1, 5), remaining)
+            session_key = f'{SESSION_PREFIX}{session:035x}'
+            for product_id in rng.sample(product_ids, lines):
+                yield CartItem(session_key=session_key, product_id=product_id, quantity=rng.randint(1, 3))
+            session += 1
+            remaining -= lines
+
+    for batch in _batches(rows()):
+        CartItem.objects.bulk_create(batch)
+        data.cart_items += len(batch)
+
+
+def _create_orders(rng, product_ids, prices, orders_per_day, now, data):
+    for day in range(365, 0, -1):
+        orders, lines = [], []
+        for number in range(orders_per_day):
+            picked = [(pk, rng.randint(1, 2)) for pk in rng.sample(product_ids, rng.randint(1, 4))]
+            lines.append(picked)
+            orders.append(Order(
+                full_name=f'{CUSTOMER} {day}-{number}',
+                phone='+380000000000',
+                is_processed=day > 2,
+                total=sum(prices[pk] * quantity for pk, quantity in picked),
+                item_count=sum(quantity for _, quantity in picked),
+            ))
+        created = Order.objects.bulk_create(orders)
+        Order.objects.filter(pk__in=[order.pk for order in created]).update(
+            created_at=now - timedelta(days=day, seconds=rng.randrange(86400))
+        )
+        items = [
+            OrderItem(order_id=order.pk, product_id=pk, quantity=quantity, price=prices[pk])
+            for order, picked in zip(created, lines) for pk, quantity in picked
+        ]
+        OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        data.orders += len(created)
+        data.order_items += len(items)
+
+
+def _refresh_derived():
+    rebuild_facet_counts(Product, FacetCount)
+    rebuild_search_index()
+    bump_catalog_version()
+
+
+def generate_benchmark_data(products=100_000, images_per_product=2, cart_items=1_000_000,
+                            orders_per_day=100, seed=42):
+    rng = random.Random(seed)
+    now = timezone.now()
+    data = BenchmarkData()
+    with transaction.atomic():
+        prices = _create_products(rng, products, images_per_product, now, data)
+    product_ids = list(prices)
+    with transaction.atomic():
+        _create_cart_items(rng, product_ids, cart_items, data)
+    with transaction.atomic():
+        _create_orders(rng, product_ids, prices, orders_per_day, now, data)
+    _refresh_derived()
+    return data
+
+
+def clear_benchmark_data():
+    # _raw_delete — один DELETE без загрузки объектов и сигналов (как у bulk_create,
+    # производные данные пересчитываются в конце); порядок — от зависимых таблиц
+    using = 'default'
+    products = Product.objects.filter(sku__startswith=SKU_PREFIX)
+    with transaction.atomic():
+        # предрасчёты похожих и "разом купують" ссылаются на товары; CASCADE и
+        # SET_NULL делает Django, а не БД, поэтому здесь — вручную
+        ProductVector.objects.filter(product__in=products)._raw_delete(using)
+        SimilarProduct.objects.filter(product__in=products)._raw_delete(using)
+        # пустая ссылка — признак для rebuild_similar_products пересчитать соседей
+        SimilarProduct.objects.filter(similar__in=products).update(similar=None)
+        # пары считались и по тестовым заказам, которые удаляются из-под водяного
+        # знака: сбрасываем всё, следующий update_bought_together пересчитает с нуля
+        # (только пары с тестовыми товарами и знак 0 — настоящие заказы учлись бы дважды)
+        ProductPair.objects.all()._raw_delete(using)
+        JobWatermark.advance(copurchase.WATERMARK, 0)
+        JobWatermark.objects.filter(name=ranking.WATERMARK).delete()  # следующий rank_products — полный
+        CartItem.objects.filter(session_key__startswith=SESSION_PREFIX)._raw_delete(using)
+        CartItem.objects.filter(product__in=products)._raw_delete(using)
+        OrderItem.objects.filter(order__full_name__startswith=CUSTOMER)._raw_delete(using)
+        Order.objects.filter(full_name__startswith=CUSTOMER)._raw_delete(using)
+        OrderItem.objects.filter(product__in=products).update(product=None)
+        ProductImage.objects.filter(product__in=products)._raw_delete(using)
+        deleted = products._raw_delete(using)
+    _refresh_derived()
+    return deleted
+
+
+# =====================
+# ПРОГОН ПО URL
+# =====================
+# Каждый URL из main/urls.py (по имени) — сценарий: функция, которая готовит
+# клиента (корзина, товар в ней) и возвращает (метод, путь, данные). Подготовка
+# не замеряется. Для каждого запроса пишутся время, число и время SQL (по всем
+# соединениям, через main/perf.py) и время рендера; отдельным проходом под
+# tracemalloc — пик памяти Python на запрос.
+class BenchmarkContext:
+    """Товары и параметры, которыми заполняются URL сценариев."""
+
+    def __init__(self):
+        available = Product.objects.filter(is_available=True)
+        stocked = list(available.order_by('-stock').values_list('pk', flat=True)[:3])
+        if not stocked:
+            raise ValueError('В каталоге нет доступных товаров — сначала seed_benchmark_data')
+        self.product_id = stocked[0]
+        self.cart_product_ids = stocked
+        product = Product.objects.get(pk=self.product_id)
+        self.brand = product.brand or ''
+        self.search = product.title.split()[0]
+        self.cursor = make_client().get(reverse('products_more')).get('X-Next-Cursor', '')
+
+
+def make_client():
+    # команда работает вне тестового окружения: хост "testserver" не в ALLOWED_HOSTS
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+    return Client(HTTP_HOST=host)
+
+
+def _fill_cart(client, ctx):
+    for pk in ctx.cart_product_ids:
+        client.post(reverse('add_to_cart', args=[pk]))
+
+
+def _cart_item_id(client, product_id):
+    if settings.CART_BACKEND == 'cookie':
+        return product_id
+    return CartItem.objects.filter(
+        session_key=client.session.session_key, product_id=product_id
+    ).values_list('pk', flat=True).first()
+
+
+def _with_cart(scenario):
+    # корзину наполняем один раз на клиента, оформление заказа — перед каждым запросом
+    def prepare(client, ctx):
+        if not getattr(client, 'cart_filled', False):
+            _fill_cart(client, ctx)
+            client.cart_filled = True
+        return scenario(client, ctx)
+    return prepare
+
+
+def _place_order(client, ctx):
+    _fill_cart(client, ctx)
+    return 'post', reverse('place_order'), {'full_name': CUSTOMER, 'phone': '+380000000000'}
+
+
+def _remove(client, ctx):
+    client.post(reverse('add_to_cart', args=[ctx.product_id]))
+    return 'post', reverse('remove_from_cart', args=[_cart_item_id(client, ctx.product_id)]), None
+
+
+SCENARIOS = {
+    'index': lambda client, ctx: ('get', reverse('index'), None),
+    'products': lambda client, ctx: ('get', reverse('products'), None),
+    'products:filtered': lambda client, ctx: ('get', reverse('products'), {'brand': ctx.brand, 'ram_gb': 16}),
+    'products:search': lambda client, ctx: ('get', reverse('products'), {'q': ctx.search}),
+    'products_more': lambda client, ctx: ('get', reverse('products_more'), {'after': ctx.cursor}),
+    'product_detail': lambda client, ctx: ('get', reverse('product_detail', args=[ctx.product_id]), None),
+    'cart': _with_cart(lambda client, ctx: ('get', reverse('cart'), None)),
+    'add_to_cart': lambda client, ctx: ('post', reverse('add_to_cart', args=[ctx.product_id]), None),
+    'update_quantity': _with_cart(lambda client, ctx: (
+        'post', reverse('update_quantity', args=[_cart_item_id(client, ctx.product_id), 'increase']), None
+    )),
+    'remove_from_cart': _remove,
+    'checkout': _with_cart(lambda client, ctx: ('get', reverse('checkout'), None)),
+    'place_order': _place_order,
+    'about': lambda client, ctx: ('get', reverse('about'), None),
+    'faq': lambda client, ctx: ('get', reverse('faq'), None),
+    'buy_now': lambda client, ctx: ('get', reverse('buy_now', args=[ctx.product_id]), None),
+    'feed': lambda client, ctx: ('get', reverse('feed', args=['xml']), None),
+    'feed:csv': lambda client, ctx: ('get', reverse('feed', args=['csv']), None),
+}
+
+# смесь для нагрузочного прогона: просмотр каталога и немного корзины;
+# по HTTP (base_url) — только READ_ONLY, без сессии и POST
+READ_ONLY = ('index', 'products', 'products:filtered', 'products:search', 'products_more', 'product_detail')
+LOAD_MIX = {
+    'index': 15,
+    'products': 20,
+    'products:filtered': 10,
+    'products:search': 10,
+    'products_more': 10,
+    'product_detail': 25,
+    'cart': 5,
+    'add_to_cart': 5,
+}
+
+
+def uncovered_url_names():
+    """Имена из main/urls.py без сценария — чтобы новый URL не выпал из бенчмарка."""
+    covered = {name.partition(':')[0] for name in SCENARIOS}
+    return sorted({pattern.name for pattern in urlpatterns if pattern.name} - covered)
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _latency_stats(seconds):
+    ordered = sorted(seconds)
+    if not ordered:
+        return {'count': 0}
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50_ms': round(_percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(_percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(_percentile(ordered, 99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def _request(client, method, path, data):
+    response = getattr(client, method)(path, data or {})
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+    return response.status_code
+
+
+def _measure(client, ctx, scenario):
+    method, path, data = scenario(client, ctx)
+    token = perf.start()
+    started = time.perf_counter()
+    status = _request(client, method, path, data)
+    elapsed = time.perf_counter() - started
+    return status, elapsed, perf.stop(token)
+
+
+def bench_urls(ctx, names=None, requests=20, warmup=2):
+    results = {}
+    for name in names or SCENARIOS:
+        scenario = SCENARIOS[name]
+        client = make_client()
+        for _ in range(warmup):
+            _request(client, *scenario(client, ctx))
+
+        latencies, queries, db_ms, tpl_ms, statuses = [], [], [], [], set()
+        for _ in range(requests):
+            status, elapsed, timings = _measure(client, ctx, scenario)
+            statuses.add(status)
+            latencies.append(elapsed)
+            queries.append(timings.db_count)
+            db_ms.append(timings.db_time * 1000)
+            tpl_ms.append(timings.template_time * 1000)
+
+        tracemalloc.start()
+        try:
+            _request(client, *scenario(client, ctx))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results[name] = {
+            **_latency_stats(latencies),
+            'status': sorted(statuses),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'db_mean_ms': round(sum(db_ms) / len(db_ms), 2),
+            'template_mean_ms': round(sum(tpl_ms) / len(tpl_ms), 2),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+    return results
+
+
+# =====================
+# НАГРУЗКА
+# =====================
+# concurrency потоков, каждый со своим клиентом, делают requests запросов
+# по смеси LOAD_MIX. Без base_url — тестовый клиент в этом процессе (одно ядро
+# из-за GIL: показывает конкуренцию за БД и блокировки, а не пропускную
+# способность сервера); с base_url — настоящие HTTP-запросы к запущенному
+# gunicorn/uvicorn, только GET-сценарии смеси.
+class _HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def get(self, path, data):
+        query = '?' + urllib.parse.urlencode(data) if data else ''
+        try:
+            with urllib.request.urlopen(self.base_url + path + query, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+
+def run_load(ctx, requests=1000, concurrency=8, base_url=None, seed=42):
+    mix = [name for name in LOAD_MIX if not base_url or name in READ_ONLY]
+    rng = random.Random(seed)
+    plan = rng.choices(mix, weights=[LOAD_MIX[name] for name in mix], k=requests)
+    lock = threading.Lock()
+    latencies = {name: [] for name in mix}
+    errors = []
+
+    def worker(part):
+        client = _HttpClient(base_url) if base_url else make_client()
+        try:
+            for name in part:
+                method, path, data = SCENARIOS[name](client, ctx)
+                started = time.perf_counter()
+                try:
+                    if base_url:
+                        status = client.get(path, data)
+                    else:
+                        status = _request(client, method, path, data)
+                except Exception as exc:  # считаем, а не прерываем прогон
+                    status = repr(exc)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies[name].append(elapsed)
+                    if not isinstance(status, int) or status >= 500:
+                        errors.append(f'{name}: {status}')
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, [plan[i::concurrency] for i in range(concurrency)]))
+    duration = time.perf_counter() - started
+
+    return {
+        'target': base_url or 'test-client',
+        'concurrency': concurrency,
+        'requests': requests,
+        'duration_s': round(duration, 2),
+        'rps': round(requests / duration, 1),
+        'errors': len(errors),
+        'error_samples': errors[:10],
+        **_latency_stats([value for values in latencies.values() for value in values]),
+        'by_url': {name: _latency_stats(values) for name, values in latencies.items() if values},
+    }
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # Linux отдаёт ru_maxrss в КБ
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_benchmark(names=None, requests=20, warmup=2, load_requests=0, concurrency=8, base_url=None):
+    ctx = BenchmarkContext()
+    report = {
+        'started_at': timezone.now().isoformat(),
+        'environment': {
+            'database': connection.vendor,
+            'cart_backend': settings.CART_BACKEND,
+            'page_cache': settings.PAGE_CACHE_ENABLED,
+            'local_images': settings.LOCAL_IMAGES,
+            'debug': settings.DEBUG,
+        },
+        'data': {
+            'products': Product.objects.count(),
+            'cart_items': CartItem.objects.count(),
+            'orders': Order.objects.count(),
+        },
+        'uncovered_urls': uncovered_url_names(),
+        'urls': bench_urls(ctx, names, requests, warmup),
+    }
+    if load_requests:
+        report['load'] = run_load(ctx, load_requests, concurrency, base_url)
+    report['max_rss_mb'] = _max_rss_mb()
+    return report
+
+
+def write_report(report, fh):
+    json.dump(report, fh, ensure_ascii=False, indent=2)
+    fh.write('\n')
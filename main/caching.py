@@ -0,0 +1,171 @@
+import hashlib
+import re
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+
+
+# =====================
+# ВЕРСИЯ КАТАЛОГА ДЛЯ КЕША
+# =====================
+# Все кешированные куски каталога содержат в ключе версию. Любое изменение
+# Product / ProductImage (сигналы в main/signals.py) выставляет новую версию —
+# старые записи просто перестают читаться и вытесняются по таймауту.
+#
+# Сама версия хранится в БД (строка JobWatermark 'catalog:version'), а не только
+# в кеше: команды cron и другие воркеры со своим LocMem иначе её бы не увидели.
+# В кеше лежит копия на CATALOG_VERSION_TTL секунд — БД читается не чаще раза
+# за этот срок на процесс; с общим кешем (Redis, Memcached) новая версия видна сразу.
+CATALOG_VERSION_KEY = 'catalog:version'
+FEATURED_LIMIT = 6
+
+
+def _stored_version():
+    from .models import JobWatermark
+
+    return JobWatermark.read(CATALOG_VERSION_KEY)
+
+
+async def _astored_version():
+    from .models import JobWatermark
+
+    return await JobWatermark.objects.filter(name=CATALOG_VERSION_KEY).values_list('position', flat=True).afirst() or 0
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = _stored_version()
+        cache.set(CATALOG_VERSION_KEY, version, settings.CATALOG_VERSION_TTL)
+    return version
+
+
+async def acatalog_version():
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        version = await _astored_version()
+        await cache.aset(CATALOG_VERSION_KEY, version, settings.CATALOG_VERSION_TTL)
+    return version
+
+
+def bump_catalog_version():
+    from .models import JobWatermark
+
+    # значение — время в нс; строка пишется в транзакции изменения, кеш — после коммита
+    version = time.time_ns()
+    JobWatermark.advance(CATALOG_VERSION_KEY, version)
+    transaction.on_commit(lambda: cache.set(CATALOG_VERSION_KEY, version, settings.CATALOG_VERSION_TTL))
+
+
+async def aget_featured_products():
+    from .models import Product
+
+    key = f'featured:{await acatalog_version()}'
+    products = await cache.aget(key)
+    if products is None:
+        products = [
+            product async for product in
+            Product.objects.filter(is_available=True)
+            .order_by('-featured_score', '-is_featured', '-created_at', 'id')[:FEATURED_LIMIT]
+        ]
+        await cache.aset(key, products)
+    return products
+
+
+# =====================
+# КЕШ СТРАНИЦ ДЛЯ АНОНИМНЫХ ПОСЕТИТЕЛЕЙ
+# =====================
+# Страницы каталога одинаковы для всех, кроме языка и счётчика корзины в шапке,
+# поэтому ключ = версия каталога + язык + cookie со счётчиком + путь.
+# CSRF-токены форм (смена языка, "в корзину") в кеш не попадают как есть:
+# при выдаче они заменяются токеном текущего посетителя.
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _page_key(request, version):
+    cart_count = request.COOKIES.get(settings.CART_COUNT_COOKIE, '0')
+    raw = f'{request.get_full_path()}|{translation.get_language()}|{cart_count}'
+    return f'page:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _cacheable_request(request):
+    # пользователя проверяет сама обёртка: в sync и async он читается по-разному
+    if not settings.PAGE_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    # сессия без cookie-счётчика: шапка может показывать корзину, которой нет в ключе
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and settings.CART_COUNT_COOKIE not in request.COOKIES:
+        return False
+    return True
+
+
+def _with_fresh_csrf(request, content):
+    if b'csrfmiddlewaretoken' not in content:
+        return content
+    token = get_token(request)
+    return CSRF_INPUT_RE.sub(lambda m: m.group(1) + token + m.group(2), content.decode()).encode()
+
+
+def _cached_response(request, cached):
+    content, content_type = cached
+    response = HttpResponse(_with_fresh_csrf(request, content), content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _storable(response):
+    """(content, content_type) для кеша или None, если ответ кешировать нельзя."""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    response['X-Page-Cache'] = 'miss'
+    return response.content, response['Content-Type']
+
+
+def cache_anonymous_page(view):
+    # работает и с async-вьюхами: под ASGI кеш и пользователь читаются без потоков
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not _cacheable_request(request) or (await request.auser()).is_authenticated:
+                return await view(request, *args, **kwargs)
+
+            key = _page_key(request, await acatalog_version())
+            cached = await cache.aget(key)
+            if cached is not None:
+                response = _cached_response(request, cached)
+            else:
+                response = await view(request, *args, **kwargs)
+                stored = _storable(response)
+                if stored is not None:
+                    await cache.aset(key, stored, settings.PAGE_CACHE_TIMEOUT)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable_request(request) or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        key = _page_key(request, catalog_version())
+        cached = cache.get(key)
+        if cached is not None:
+            response = _cached_response(request, cached)
+        else:
+            response = view(request, *args, **kwargs)
+            stored = _storable(response)
+            if stored is not None:
+                cache.set(key, stored, settings.PAGE_CACHE_TIMEOUT)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
@@ -0,0 +1,303 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import DecimalField, ExpressionWrapper, F, IntegerField, Sum, Window
+from django.db.models.functions import Coalesce
+from django.http import Http404
+
+from .models import CartItem, Product
+
+
+# =====================
+# СВОДКА КОРЗИНЫ
+# =====================
+# Позиции, суммы строк и итог корзины считаются в БД одним запросом:
+# товар подтягивается через select_related, итог и количество — оконным Sum.
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+unit_price = Coalesce('product__discount_price', 'product__price')
+line_total = ExpressionWrapper(unit_price * F('quantity'), output_field=MONEY)
+
+
+def cart_items_queryset(session_key):
+    return (
+        CartItem.objects
+        .filter(session_key=session_key)
+        .select_related('product')
+        .annotate(
+            unit_price=unit_price,
+            line_total=line_total,
+            cart_total=Window(Sum(line_total), output_field=MONEY),
+            cart_count=Window(Sum('quantity'), output_field=IntegerField()),
+        )
+        .order_by('id')
+    )
+
+
+class CartSummary:
+    def __init__(self, items, total=None, count=None):
+        self.items = items
+        if total is None:
+            total = items[0].cart_total if items else Decimal('0')
+        if count is None:
+            count = items[0].cart_count if items else 0
+        self.total = total
+        self.count = count
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+# =====================
+# КОРЗИНА: ОБЩИЙ ИНТЕРФЕЙС
+# =====================
+# Вьюхи работают только через get_cart(request); хранилище выбирается
+# настройкой CART_BACKEND: 'db' (CartItem по session_key) или 'cookie'
+# (подписанная cookie, БД трогается только при оформлении заказа).
+# item_id в URL — id строки CartItem для 'db' и id товара для 'cookie'.
+class BaseCart:
+    def __init__(self, request):
+        self.request = request
+        self._summary = None
+
+    def summary(self):
+        if self._summary is None:
+            self._summary = self._load_summary()
+        return self._summary
+
+    def count(self):
+        return self.summary().count
+
+    # для async-вьюх (ASGI): после asummary() / acount() шаблон и шапка
+    # читают уже загруженную сводку и не трогают БД из цикла событий
+    async def asummary(self):
+        if self._summary is None:
+            self._summary = await self._aload_summary()
+        return self._summary
+
+    async def acount(self):
+        return (await self.asummary()).count
+
+    def finish(self, response):
+        # счётчик для шапки и ключа кеша страниц (main.caching.cache_anonymous_page)
+        response.set_cookie(
+            settings.CART_COUNT_COOKIE,
+            self.count(),
+            max_age=settings.SESSION_COOKIE_AGE,
+            samesite='Lax',
+        )
+        return response
+
+    def _changed(self):
+        self._summary = None
+
+
+# =====================
+# КОРЗИНА В БД: ИЗМЕНЕНИЯ ОДНИМ ЗАПРОСОМ
+# =====================
+# Двойной клик или две вкладки приходят параллельно, поэтому количество не
+# читается в Python и не пишется обратно: добавление — upsert по уникальному
+# (session_key, product), +1/-1 — UPDATE с F('quantity') и условием в WHERE.
+# Потолок — остаток на складе (Product.stock), его проверяет та же команда.
+CART_TABLE = CartItem._meta.db_table
+PRODUCT_TABLE = Product._meta.db_table
+
+ADD_SQL = (
+    f"INSERT INTO {CART_TABLE} (session_key, product_id, quantity) "
+    f"SELECT %s, id, 1 FROM {PRODUCT_TABLE} WHERE id = %s AND stock > 0 "
+    f"ON CONFLICT (session_key, product_id) DO UPDATE SET quantity = {CART_TABLE}.quantity + 1 "
+    f"WHERE {CART_TABLE}.quantity < (SELECT stock FROM {PRODUCT_TABLE} WHERE id = {CART_TABLE}.product_id)"
+)
+
+
+class DatabaseCart(BaseCart):
+    def _session_key(self, create=False):
+        session = self.request.session
+        if create and not session.session_key:
+            session.create()
+        return session.session_key
+
+    def _load_summary(self):
+        session_key = self._session_key()
+        return CartSummary(list(cart_items_queryset(session_key)) if session_key else [])
+
+    async def _aload_summary(self):
+        session_key = self._session_key()
+        if not session_key:
+            return CartSummary([])
+        return CartSummary([item async for item in cart_items_queryset(session_key)])
+
+    def _item(self, item_id):
+        session_key = self._session_key()
+        if not session_key:
+            raise Http404
+        return CartItem.objects.filter(id=item_id, session_key=session_key)
+
+    def add(self, product):
+        session_key = self._session_key(create=True)
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute(ADD_SQL, [session_key, product.pk])
+        elif product.stock > 0:
+            # без ON CONFLICT: get_or_create ловит IntegrityError от параллельной вставки
+            item, created = CartItem.objects.get_or_create(
+                session_key=session_key,
+                product=product,
+                defaults={'quantity': 1}
+            )
+            if not created:
+                CartItem.objects.filter(id=item.id, quantity__lt=F('product__stock')).update(quantity=F('quantity') + 1)
+        self._changed()
+
+    def update(self, item_id, action):
+        item = self._item(item_id)
+        changed = 0
+        if action == 'increase':
+            changed = item.filter(quantity__lt=F('product__stock')).update(quantity=F('quantity') + 1)
+        elif action == 'decrease':
+            changed = item.filter(quantity__gt=1).update(quantity=F('quantity') - 1)
+        # ноль строк — упёрлись в склад или в 1; лишний запрос только тогда
+        if not changed and not item.exists():
+            raise Http404
+        self._changed()
+
+    def remove(self, item_id):
+        deleted, _ = self._item(item_id).delete()
+        if not deleted:
+            raise Http404
+        self._changed()
+
+    def clear(self):
+        session_key = self._session_key()
+        if session_key:
+            CartItem.objects.filter(session_key=session_key).delete()
+        self._changed()
+
+
+class CookieCartItem:
+    # та же форма, что у строк cart_items_queryset, чтобы шаблоны не различали бэкенды
+    def __init__(self, product, quantity):
+        self.id = product.id
+        self.product = product
+        self.quantity = quantity
+        self.unit_price = product.get_display_price()
+        self.line_total = self.unit_price * quantity
+
+
+class CookieCart(BaseCart):
+    SALT = 'main.cart'
+    MAX_LINES = 50
+    MAX_QUANTITY = 99
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.quantities = self._read()
+        self._dirty = False
+
+    # формат: "id:кол-во,id:кол-во" — компактно и без JSON
+    def _read(self):
+        raw = self.request.get_signed_cookie(settings.CART_COOKIE_NAME, default='', salt=self.SALT)
+        quantities = {}
+        for part in raw.split(','):
+            product_id, _, quantity = part.partition(':')
+            if product_id.isdigit() and quantity.isdigit() and int(quantity) > 0:
+                quantities[int(product_id)] = min(int(quantity), self.MAX_QUANTITY)
+        return quantities
+
+    def _dump(self):
+        return ','.join(f'{pk}:{qty}' for pk, qty in self.quantities.items())
+
+    def _load_summary(self):
+        if not self.quantities:
+            return CartSummary([])
+        return self._summary_from(Product.objects.in_bulk(list(self.quantities)))
+
+    def _summary_from(self, products):
+        items = [
+            CookieCartItem(products[pk], qty)
+            for pk, qty in self.quantities.items() if pk in products
+        ]
+        return CartSummary(
+            items,
+            total=sum((item.line_total for item in items), Decimal('0')),
+            count=sum(item.quantity for item in items),
+        )
+
+    async def _aload_summary(self):
+        if not self.quantities:
+            return CartSummary([])
+        return self._summary_from(await Product.objects.ain_bulk(list(self.quantities)))
+
+    def _changed(self):
+        super()._changed()
+        self._dirty = True
+
+    def count(self):
+        # без запроса к товарам — всё есть в cookie
+        return sum(self.quantities.values())
+
+    async def acount(self):
+        return self.count()
+
+    def add(self, product):
+        limit = min(product.stock, self.MAX_QUANTITY)
+        if product.pk in self.quantities:
+            if self.quantities[product.pk] < limit:
+                self.quantities[product.pk] += 1
+        elif limit > 0 and len(self.quantities) < self.MAX_LINES:
+            self.quantities[product.pk] = 1
+        self._changed()
+
+    def update(self, item_id, action):
+        if item_id not in self.quantities:
+            raise Http404
+        if action == 'increase':
+            # тот же потолок, что у add(): остаток на складе, но не больше MAX_QUANTITY
+            stock = Product.objects.filter(pk=item_id).values_list('stock', flat=True).first() or 0
+            if self.quantities[item_id] < min(stock, self.MAX_QUANTITY):
+                self.quantities[item_id] += 1
+        elif action == 'decrease' and self.quantities[item_id] > 1:
+            self.quantities[item_id] -= 1
+        self._changed()
+
+    def remove(self, item_id):
+        if self.quantities.pop(item_id, None) is None:
+            raise Http404
+        self._changed()
+
+    def clear(self):
+        self.quantities = {}
+        self._changed()
+
+    def finish(self, response):
+        if self._dirty:
+            if self.quantities:
+                response.set_signed_cookie(
+                    settings.CART_COOKIE_NAME,
+                    self._dump(),
+                    salt=self.SALT,
+                    max_age=settings.SESSION_COOKIE_AGE,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            else:
+                response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+        return super().finish(response)
+
+
+CART_BACKENDS = {
+    'db': DatabaseCart,
+    'cookie': CookieCart,
+}
+
+
+def get_cart(request):
+    # один объект на запрос: шапка (иконка корзины) и страница используют одну выборку
+    cart = getattr(request, '_cart', None)
+    if cart is None:
+        cart = request._cart = CART_BACKENDS[settings.CART_BACKEND](request)
+    return cart
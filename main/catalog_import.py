@@ -0,0 +1,350 @@
+import codecs
+import csv
+import hashlib
+import io
+import itertools
+import os
+import re
+import zipfile
+from decimal import Decimal, InvalidOperation
+from xml.etree import ElementTree
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from .caching import bump_catalog_version
+from .facets import rebuild_facet_counts
+from .models import FacetCount, Product
+from .search import rebuild_search_index
+
+
+# =====================
+# ИМПОРТ КАТАЛОГА ИЗ CSV / XLSX
+# =====================
+# Файл читается построчно (XLSX — потоковым разбором XML листа). Сначала он
+# прочитывается целиком без записи: битая кодировка или XML посреди файла
+# отклоняют импорт до первого изменения, а не после половины пачек. Затем строки
+# проверяются и пачками по BATCH_SIZE сопоставляются с товарами по sku:
+# новые создаются bulk_create, изменённые — bulk_update только колонок из файла.
+# Строка, чей хеш значений совпадает с хешем текущих полей товара, не пишется.
+# bulk-операции обходят сигналы, поэтому фасеты, поисковый индекс и версия
+# каталога пересчитываются один раз в конце.
+BATCH_SIZE = 500
+READ_BLOCK = 64 * 1024
+REQUIRED_FOR_NEW = ('title', 'price')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', '+', 'да', 'так'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'n', '-', 'нет', 'ні'}
+
+
+class CatalogImportError(Exception):
+    """Файл целиком не подходит для импорта (формат, нет колонки sku)."""
+
+
+def _text(max_length, nullable=True):
+    def parse(value):
+        value = value.strip()
+        if len(value) > max_length:
+            raise ValueError(f'длиннее {max_length} символов')
+        return value or (None if nullable else '')
+    return parse
+
+
+def _int(value):
+    value = value.strip().replace(' ', '')
+    if not value:
+        return 0
+    try:
+        number = Decimal(value.replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError('нужно целое число')
+    if number != number.to_integral_value() or number < 0:
+        raise ValueError('нужно целое неотрицательное число')
+    return int(number)
+
+
+def _money(nullable):
+    def parse(value):
+        value = value.strip().replace(' ', '').replace(',', '.')
+        if not value:
+            if nullable:
+                return None
+            raise ValueError('обязательное поле')
+        try:
+            amount = Decimal(value).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError('нужна сумма, например 12999.00')
+        if amount < 0:
+            raise ValueError('сумма не может быть отрицательной')
+        return amount
+    return parse
+
+
+def _bool(value):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError('нужно да/нет или 1/0')
+
+
+def _choice(field_name):
+    choices = Product._meta.get_field(field_name).choices
+    lookup = {}
+    for value, label in choices:
+        lookup[str(value).lower()] = value
+        lookup[str(label).lower()] = value
+
+    def parse(value):
+        value = value.strip().lower()
+        if value not in lookup:
+            raise ValueError('допустимо: ' + ', '.join(str(v) for v, _ in choices))
+        return lookup[value]
+    return parse
+
+
+# колонка файла (= поле Product) -> разбор значения
+FIELD_PARSERS = {
+    'title': _text(255, nullable=False),
+    'brand': _text(120),
+    'model_name': _text(120),
+    'cpu': _text(255),
+    'gpu': _text(255),
+    'ram_gb': _int,
+    'storage_gb': _int,
+    'storage_type': _choice('storage_type'),
+    'operating_system': _text(80),
+    'condition': _choice('condition'),
+    'description': _text(100000, nullable=False),
+    'price': _money(nullable=False),
+    'discount_price': _money(nullable=True),
+    'warranty_months': _int,
+    'stock': _int,
+    'is_available': _bool,
+    'is_featured': _bool,
+}
+
+
+# =====================
+# ЧТЕНИЕ ФАЙЛОВ
+# =====================
+def _csv_encoding(fileobj):
+    # Excel с русской/украинской локалью сохраняет CSV в cp1251, а не в UTF-8
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        while block := fileobj.read(READ_BLOCK):
+            decoder.decode(block)
+        decoder.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1251'
+    finally:
+        fileobj.seek(0)
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding=_csv_encoding(fileobj), newline='')
+    try:
+        header = text.readline()
+        # Excel с русской/украинской локалью сохраняет CSV через ';'
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        yield from csv.reader(itertools.chain([header], text), delimiter=delimiter)
+    finally:
+        text.detach()  # иначе обёртка закроет файл и второй проход не сможет его перечитать
+
+
+XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+CELL_REF_RE = re.compile(r'([A-Z]+)')
+
+
+def _column_index(ref):
+    match = CELL_REF_RE.match(ref)
+    if match is None:
+        raise ValueError(f'неверная ссылка на ячейку {ref!r}')
+    index = 0
+    for letter in match.group(1):
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _xlsx_rows(fileobj):
+    # без openpyxl: строки первого листа разбираются iterparse и сразу освобождаются
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise CatalogImportError('Файл не похож на XLSX')
+    with archive:
+        shared = []
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            with archive.open('xl/sharedStrings.xml') as fh:
+                for _, element in ElementTree.iterparse(fh):
+                    if element.tag == XLSX_NS + 'si':
+                        shared.append(''.join(t.text or '' for t in element.iter(XLSX_NS + 't')))
+                        element.clear()
+
+        sheets = sorted(name for name in archive.namelist() if name.startswith('xl/worksheets/sheet'))
+        if not sheets:
+            raise CatalogImportError('В XLSX нет листов')
+        with archive.open(sheets[0]) as fh:
+            for _, element in ElementTree.iterparse(fh):
+                if element.tag != XLSX_NS + 'row':
+                    continue
+                cells = {}
+                column = -1
+                for cell in element.iter(XLSX_NS + 'c'):
+                    # атрибут r необязателен: без него ячейка идёт следом за предыдущей
+                    ref = cell.get('r')
+                    column = _column_index(ref) if ref else column + 1
+                    kind = cell.get('t')
+                    if kind == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(XLSX_NS + 't'))
+                    else:
+                        raw = cell.find(XLSX_NS + 'v')
+                        value = (raw.text or '') if raw is not None else ''
+                        if kind == 's' and value:
+                            value = shared[int(value)]
+                    cells[column] = value
+                element.clear()
+                yield [cells.get(i, '') for i in range(max(cells) + 1)] if cells else []
+
+
+def read_rows(fileobj, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return _csv_rows(fileobj)
+    if extension == '.xlsx':
+        return _xlsx_rows(fileobj)
+    raise CatalogImportError('Поддерживаются только файлы .csv и .xlsx')
+
+
+def check_rows(rows):
+    """Читает файл до конца без записи; повреждённый файл → CatalogImportError с номером строки."""
+    number = 0
+    try:
+        for number, _ in enumerate(rows, start=1):
+            pass
+    except UnicodeDecodeError:
+        # текст декодируется блоками, поэтому номер строки здесь не точен
+        raise CatalogImportError('Файл не в кодировке UTF-8 или Windows-1251')
+    except (ValueError, IndexError, csv.Error, ElementTree.ParseError, zipfile.BadZipFile) as exc:
+        raise CatalogImportError(f'Строка {number + 1}: файл не читается ({exc})')
+    return number
+
+
+# =====================
+# ИМПОРТ
+# =====================
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []  # (номер строки, sku, сообщение)
+        self.ignored_columns = []
+
+    @property
+    def changed(self):
+        return self.created + self.updated
+
+    def errors_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('row', 'sku', 'error'))
+        writer.writerows(self.errors)
+        return buffer.getvalue()
+
+
+def _digest(values):
+    return hashlib.sha1(repr(sorted(values.items())).encode()).hexdigest()
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.report = ImportReport()
+
+    def run(self, rows):
+        rows = iter(rows)
+        header = [name.strip().lower() for name in next(rows, [])]
+        if 'sku' not in header:
+            raise CatalogImportError('В первой строке нет колонки sku')
+        columns = [(index, name) for index, name in enumerate(header) if name in FIELD_PARSERS]
+        self.report.ignored_columns = [name for name in header if name and name != 'sku' and name not in FIELD_PARSERS]
+        sku_index = header.index('sku')
+
+        seen = {}
+        batch = []
+        for number, cells in enumerate(rows, start=2):
+            if not any(cell.strip() for cell in cells):
+                continue
+            sku = cells[sku_index].strip() if sku_index < len(cells) else ''
+            values, errors = self._parse(cells, columns)
+            if not sku:
+                errors.insert(0, 'sku: обязательное поле')
+            elif sku in seen:
+                errors.insert(0, f'sku уже встречался в строке {seen[sku]}')
+            if errors:
+                self.report.errors.append((number, sku, '; '.join(errors)))
+                continue
+            seen[sku] = number
+            batch.append((number, sku, values))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+        if self.report.changed and not self.dry_run:
+            rebuild_facet_counts(Product, FacetCount)
+            rebuild_search_index()
+            bump_catalog_version()
+        return self.report
+
+    def _parse(self, cells, columns):
+        values = {}
+        errors = []
+        for index, name in columns:
+            try:
+                values[name] = FIELD_PARSERS[name](cells[index] if index < len(cells) else '')
+            except ValueError as exc:
+                errors.append(f'{name}: {exc}')
+        return values, errors
+
+    def _flush(self, batch):
+        existing = {}
+        for product in Product.objects.filter(sku__in=[sku for _, sku, _ in batch]).order_by('id'):
+            existing.setdefault(product.sku, product)  # sku не уникален в БД — берём самый старый
+
+        to_create = []
+        to_update = []
+        fields = set()
+        for number, sku, values in batch:
+            product = existing.get(sku)
+            if product is None:
+                missing = [name for name in REQUIRED_FOR_NEW if values.get(name) in (None, '')]
+                if missing:
+                    self.report.errors.append((number, sku, 'новый товар: нет ' + ', '.join(missing)))
+                    continue
+                to_create.append(Product(sku=sku, slug=slugify(values['title'], allow_unicode=True)[:255], **values))
+            elif _digest(values) != _digest({name: getattr(product, name) for name in values}):
+                for name, value in values.items():
+                    setattr(product, name, value)
+                to_update.append(product)
+                fields.update(values)
+            else:
+                self.report.unchanged += 1
+
+        if not self.dry_run:
+            with transaction.atomic():
+                Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+                if to_update:
+                    Product.objects.bulk_update(to_update, sorted(fields), batch_size=self.batch_size)
+        self.report.created += len(to_create)
+        self.report.updated += len(to_update)
+
+
+def import_catalog(fileobj, filename, batch_size=BATCH_SIZE, dry_run=False):
+    check_rows(read_rows(fileobj, filename))
+    fileobj.seek(0)
+    return CatalogImporter(batch_size=batch_size, dry_run=dry_run).run(read_rows(fileobj, filename))
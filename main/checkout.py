@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models import F
+
+from .caching import bump_catalog_version
+from .jobs import enqueue
+from .models import Order, OrderItem, Product
+
+
+# =====================
+# ОФОРМЛЕНИЕ ЗАКАЗА ОДНОЙ ТРАНЗАКЦИЕЙ
+# =====================
+class OutOfStock(Exception):
+    def __init__(self, product):
+        self.product = product
+        super().__init__(f'Недостаточно товара на складе: {product.title}')
+
+
+def place_order(full_name, phone, lines):
+    """
+    lines — список (product, quantity). Резервирует склад условным F()-апдейтом,
+    фиксирует цену в OrderItem.price, сразу заполняет Order.total / item_count
+    и создаёт позиции одним bulk_create.
+    При нехватке товара бросает OutOfStock, и вся транзакция откатывается.
+    """
+    # один товар может прийти несколькими строками; сортировка — стабильный порядок блокировок
+    quantities = {}
+    products = {}
+    for product, quantity in lines:
+        quantities[product.pk] = quantities.get(product.pk, 0) + quantity
+        products[product.pk] = product
+
+    with transaction.atomic():
+        for pk in sorted(quantities):
+            reserved = Product.objects.filter(pk=pk, stock__gte=quantities[pk]).update(
+                stock=F('stock') - quantities[pk]
+            )
+            if not reserved:
+                raise OutOfStock(products[pk])
+
+        items = [
+            OrderItem(
+                product=products[pk],
+                quantity=quantities[pk],
+                price=products[pk].get_display_price(),
+            )
+            for pk in sorted(quantities)
+        ]
+        # итоги считаем здесь же, bulk_create не вызывает сигналы OrderItem
+        order = Order.objects.create(
+            full_name=full_name,
+            phone=phone,
+            total=sum(item.price * item.quantity for item in items),
+            item_count=sum(item.quantity for item in items),
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+        # уведомления и прочее — воркером (main/jobs.py); задача фиксируется вместе с заказом
+        enqueue('order_placed', {'order_id': order.id})
+
+        # F()-апдейт не шлёт сигналы; кеш каталога сбрасываем, только если товар
+        # закончился — остаток в бейдже "осталось N шт." может отстать на PAGE_CACHE_TIMEOUT
+        if Product.objects.filter(pk__in=quantities, stock=0).exists():
+            bump_catalog_version()
+    return order
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_cart
+
+
+def cart(request):
+    # счётчик в шапке; запрос к БД только если шаблон его реально выводит
+    return {'cart_count': SimpleLazyObject(lambda: get_cart(request).count())}
@@ -0,0 +1,140 @@
+from collections import Counter
+from datetime import timedelta
+from itertools import combinations, groupby
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import JobWatermark, Order, OrderItem, Product, ProductPair
+
+
+# =====================
+# "РАЗОМ КУПУЮТЬ"
+# =====================
+# Для каждой пары товаров из одного заказа ProductPair хранит, в скольких
+# заказах они встретились вместе. Команда update_bought_together читает только
+# заказы новее водяного знака (последний обработанный id Order), считает пары
+# в памяти пачками по ORDER_BATCH заказов и прибавляет их к счётчикам одним
+# INSERT ... ON CONFLICT DO UPDATE; знак сдвигается в той же транзакции, так что
+# прерванный прогон продолжится с последней записанной пачки.
+WATERMARK = 'copurchase:order'
+ORDER_BATCH = 5000
+UPSERT_BATCH = 400
+MAX_BASKET = 20  # больше разных товаров в заказе — это опт, а не "покупают вместе"
+# заказы моложе этого не берём: заказ с меньшим id может ещё не закоммититься,
+# а знак, ушедший дальше него, его бы уже не увидел
+SETTLE_TIME = timedelta(minutes=1)
+
+PAIR_TABLE = ProductPair._meta.db_table
+
+
+class CopurchaseResult:
+    def __init__(self, mode, orders=0, pairs=0):
+        self.mode = mode
+        self.orders = orders
+        self.pairs = pairs
+
+
+def _basket_pairs(rows):
+    """rows — (order_id, product_id) по порядку заказов; → Counter пар в обе стороны."""
+    pairs = Counter()
+    for _, items in groupby(rows, key=lambda row: row[0]):
+        products = sorted({product_id for _, product_id in items})
+        if len(products) > MAX_BASKET:
+            continue
+        for first, second in combinations(products, 2):
+            pairs[first, second] += 1
+            pairs[second, first] += 1
+    return pairs
+
+
+def _add_counts(pairs):
+    items = list(pairs.items())
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        existing = {
+            (row.product_id, row.companion_id): row
+            for row in ProductPair.objects.filter(product_id__in={product for product, _ in pairs})
+        }
+        created, updated = [], []
+        for (product, companion), count in items:
+            row = existing.get((product, companion))
+            if row is None:
+                created.append(ProductPair(product_id=product, companion_id=companion, count=count))
+            else:
+                row.count += count
+                updated.append(row)
+        ProductPair.objects.bulk_create(created, batch_size=1000)
+        ProductPair.objects.bulk_update(updated, ['count'], batch_size=1000)
+        return
+    # прибавить к счётчику, а не перезаписать его — bulk_create(update_conflicts) так не умеет
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_BATCH):
+            batch = items[start:start + UPSERT_BATCH]
+            cursor.execute(
+                f"INSERT INTO {PAIR_TABLE} (product_id, companion_id, count) VALUES "
+                + ', '.join(['(%s, %s, %s)'] * len(batch))
+                + f" ON CONFLICT (product_id, companion_id) DO UPDATE SET count = {PAIR_TABLE}.count + excluded.count",
+                [value for (product, companion), count in batch for value in (product, companion, count)],
+            )
+
+
+def update_bought_together(full=False):
+    settled = Order.objects.filter(created_at__lte=timezone.now() - SETTLE_TIME)
+    high = settled.aggregate(high=Max('id'))['high'] or 0
+    if full:
+        with transaction.atomic():
+            ProductPair.objects.all().delete()
+            JobWatermark.advance(WATERMARK, 0)
+    watermark = JobWatermark.read(WATERMARK)
+    result = CopurchaseResult('full' if full or not watermark else 'incremental')
+
+    while watermark < high:
+        # пачка заказов по id: знак сдвигается на её конец, даже если в ней нет пар
+        upper = min(watermark + ORDER_BATCH, high)
+        rows = (
+            OrderItem.objects.filter(order_id__gt=watermark, order_id__lte=upper, product__isnull=False)
+            .order_by('order_id').values_list('order_id', 'product_id')
+        )
+        pairs = _basket_pairs(rows.iterator(chunk_size=5000))
+        with transaction.atomic():
+            if pairs:
+                _add_counts(pairs)
+            JobWatermark.advance(WATERMARK, upper)
+        result.orders += Order.objects.filter(id__gt=watermark, id__lte=upper).count()
+        result.pairs += len(pairs) // 2
+        watermark = upper
+
+    if result.pairs:
+        # страница товара кешируется по версии каталога
+        bump_catalog_version()
+    return result
+
+
+# ── ВЫБОРКИ ДЛЯ СТРАНИЦ ──
+def bought_together(product_id):
+    """Товары, которые чаще всего покупали вместе с данным (QuerySet для async-итерации)."""
+    return (
+        Product.objects.filter(
+            pair_entries__product_id=product_id,
+            pair_entries__count__gte=settings.BOUGHT_TOGETHER_MIN_COUNT,
+            is_available=True,
+        )
+        .order_by('-pair_entries__count', 'id')[:settings.BOUGHT_TOGETHER_SHOWN]
+    )
+
+
+def cart_cross_sells(product_ids):
+    """Дополнения к корзине: сумма совместных покупок со всеми её товарами."""
+    return (
+        Product.objects.filter(
+            pair_entries__product_id__in=product_ids,
+            pair_entries__count__gte=settings.BOUGHT_TOGETHER_MIN_COUNT,
+            is_available=True,
+        )
+        .exclude(id__in=product_ids)
+        .annotate(together=Sum('pair_entries__count'))
+        .order_by('-together', 'id')[:settings.BOUGHT_TOGETHER_SHOWN]
+    )
@@ -0,0 +1,45 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# =====================
+# МАРШРУТИЗАЦИЯ: РЕПЛИКА ДЛЯ ЧТЕНИЯ КАТАЛОГА
+# =====================
+# С реплики читаются только модели каталога и только внутри "читающего"
+# запроса (GET/HEAD не в админке) — это отмечает ReplicaReadsMiddleware.
+# Всё остальное — записи, заказы, корзина, сессии, админка, management-команды
+# (импорт, рейтинг, пересчёты) — идёт в основную БД, как и чтения внутри
+# открытой транзакции на ней: там нужны только что записанные данные.
+REPLICA_DB_ALIAS = 'replica'
+CATALOG_MODELS = {'product', 'productimage', 'facetcount', 'localimage', 'productvector', 'similarproduct', 'productpair'}
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_enabled():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            replica_reads.get()
+            and model._meta.app_label == 'main'
+            and model._meta.model_name in CATALOG_MODELS
+            and replica_enabled()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплика — копия основной БД, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
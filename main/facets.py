@@ -0,0 +1,207 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.translation import gettext_lazy as _
+
+
+# =====================
+# ФАСЕТЫ КАТАЛОГА
+# =====================
+# Счётчики хранятся в FacetCount и меняются инкрементально сигналами Product
+# (main/signals.py), поэтому страница каталога читает их одним запросом,
+# а не делает GROUP BY по каждому фасету.
+FACETS = (
+    ('brand', _('Бренд')),
+    ('cpu', _('Процесор')),
+    ('ram_gb', _('ОЗП, ГБ')),
+    ('storage_gb', _('Накопичувач, ГБ')),
+    ('storage_type', _('Тип накопичувача')),
+    ('gpu', _('Відеокарта')),
+    ('condition', _('Стан')),
+    ('operating_system', _('ОС')),
+)
+FACET_FIELDS = tuple(name for name, _label in FACETS)
+INT_FACETS = ('ram_gb', 'storage_gb')
+
+# ценовые диапазоны (грн) — отдельный фасет 'price', верхняя граница не включается
+PRICE_BUCKETS = ((0, 10000), (10000, 20000), (20000, 40000), (40000, None))
+
+def _bucket_key(low, high):
+    return f'{low}-{high}' if high is not None else f'{low}-'
+
+
+def price_bucket(price):
+    for low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return _bucket_key(low, high)
+    return None
+
+
+def facet_values(product):
+    """Множество пар (фасет, значение), которые товар добавляет к счётчикам."""
+    if product is None or not product.is_available:
+        return set()
+
+    pairs = set()
+    for name in FACET_FIELDS:
+        value = getattr(product, name)
+        if name in INT_FACETS:
+            if value:
+                pairs.add((name, str(value)))
+        elif value and str(value).strip():
+            pairs.add((name, str(value).strip()))
+
+    bucket = price_bucket(product.discount_price or product.price)
+    if bucket:
+        pairs.add(('price', bucket))
+    return pairs
+
+
+def apply_facet_delta(old_pairs, new_pairs):
+    from .models import FacetCount
+
+    removed = old_pairs - new_pairs
+    added = new_pairs - old_pairs
+    if not removed and not added:
+        return
+
+    with transaction.atomic():
+        for facet, value in removed:
+            FacetCount.objects.filter(facet=facet, value=value, count__gt=0).update(count=F('count') - 1)
+        for facet, value in added:
+            updated = FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + 1)
+            if not updated:
+                FacetCount.objects.get_or_create(facet=facet, value=value, defaults={'count': 0})
+                FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + 1)
+
+
+def rebuild_facet_counts(product_model, facet_model):
+    """Полный пересчёт (после миграции, импорта или bulk_update в обход сигналов)."""
+    counts = {}
+    products = product_model.objects.filter(is_available=True).only(
+        'is_available', 'price', 'discount_price', *FACET_FIELDS
+    )
+    for product in products.iterator(chunk_size=2000):
+        for pair in facet_values(product):
+            counts[pair] = counts.get(pair, 0) + 1
+
+    with transaction.atomic():
+        facet_model.objects.all().delete()
+        facet_model.objects.bulk_create(
+            [facet_model(facet=facet, value=value, count=count) for (facet, value), count in counts.items()],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+# =====================
+# ФИЛЬТРАЦИЯ
+# =====================
+# границы колонок: цена — DecimalField(max_digits=10, decimal_places=2),
+# ОЗП и накопитель — PositiveIntegerField; всё, что не влезает, отбрасывается
+PRICE_LIMIT = Decimal('1e8')
+INT_FACET_MAX = 2147483647
+
+
+def _to_decimal(value):
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+    # nan и inf Decimal принимает, а БД — нет
+    if not number.is_finite() or abs(number) >= PRICE_LIMIT:
+        return None
+    return number.quantize(Decimal('0.01'))
+
+
+def _int_values(values):
+    # значения — строки, как в FacetCount.value: '016' и '16' — одно и то же
+    return [str(int(v)) for v in values if v.isdigit() and int(v) <= INT_FACET_MAX]
+
+
+def parse_filters(params):
+    """Разбирает GET-параметры: ?brand=Dell&brand=HP&ram_gb=16&price=0-10000&price_min=&price_max="""
+    selected = {}
+    for name in FACET_FIELDS:
+        values = [v for v in params.getlist(name) if v]
+        if name in INT_FACETS:
+            values = _int_values(values)
+        if values:
+            selected[name] = values
+
+    buckets = [v for v in params.getlist('price') if v in {_bucket_key(*b) for b in PRICE_BUCKETS}]
+    if buckets:
+        selected['price'] = buckets
+
+    price_min = _to_decimal(params.get('price_min') or None)
+    price_max = _to_decimal(params.get('price_max') or None)
+    return selected, price_min, price_max
+
+
+def filter_products(queryset, selected, price_min=None, price_max=None):
+    # внутри фасета — ИЛИ, между фасетами — И
+    for name, values in selected.items():
+        if name == 'price':
+            continue
+        queryset = queryset.filter(**{f'{name}__in': values})
+
+    # Product.effective_price — хранимая колонка под индексом product_effective_price_idx
+    if 'price' in selected:
+        ranges = Q()
+        for key in selected['price']:
+            low, high = key.split('-')
+            bucket = Q(effective_price__gte=int(low))
+            if high:
+                bucket &= Q(effective_price__lt=int(high))
+            ranges |= bucket
+        queryset = queryset.filter(ranges)
+    if price_min is not None:
+        queryset = queryset.filter(effective_price__gte=price_min)
+    if price_max is not None:
+        queryset = queryset.filter(effective_price__lte=price_max)
+    return queryset
+
+
+def _value_label(name, value):
+    if name == 'price':
+        low, high = value.split('-')
+        return f'{low}–{high}' if high else f'{low}+'
+    return value
+
+
+def _facet_counts():
+    from .models import FacetCount
+
+    return FacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count')
+
+
+def facet_groups(selected, counts=None):
+    """Счётчики для панели фильтров: [(name, label, active, [(value, text, count, checked), ...]), ...]"""
+    if counts is None:
+        counts = _facet_counts()
+
+    by_facet = {}
+    for facet, value, count in counts:
+        by_facet.setdefault(facet, []).append((value, count))
+
+    groups = []
+    for name, label in FACETS + (('price', _('Ціна, ₴')),):
+        rows = by_facet.get(name)
+        if not rows:
+            continue
+        if name in INT_FACETS:
+            rows.sort(key=lambda row: int(row[0]))
+        elif name == 'price':
+            rows.sort(key=lambda row: int(row[0].split('-')[0]))
+        else:
+            rows.sort()
+        chosen = set(selected.get(name, ()))
+        groups.append((name, label, bool(chosen), [
+            (value, _value_label(name, value), count, value in chosen) for value, count in rows
+        ]))
+    return groups
+
+
+async def afacet_groups(selected):
+    return facet_groups(selected, [row async for row in _facet_counts()])
@@ -0,0 +1,204 @@
+import csv
+import glob
+import os
+import re
+import uuid
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import reverse
+
+from .caching import catalog_version
+from .images import image_url
+from .models import Product
+
+
+# =====================
+# ФИД КАТАЛОГА ДЛЯ АГРЕГАТОРОВ (Google Merchant XML / CSV)
+# =====================
+# Товары читаются iterator(chunk_size=FEED_CHUNK_SIZE): в памяти всегда одна
+# пачка товаров вместе с их фото (prefetch выполняется на каждую пачку),
+# и каждая пачка сразу уходит клиенту/в файл. Готовый фид сохраняется в
+# FEED_ROOT под именем с версией каталога, так что пока каталог не менялся,
+# повторные запросы получают статический файл.
+FEED_CONTENT_TYPES = {
+    'xml': 'application/xml; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+FEED_COLUMNS = (
+    'id', 'title', 'description', 'link', 'image_link', 'additional_image_link',
+    'availability', 'price', 'sale_price', 'brand', 'mpn', 'condition',
+)
+FEED_FILE_RE = re.compile(r'^catalog-(\d+)\.\w+$')
+FILE_BLOCK_SIZE = 64 * 1024
+MAX_ADDITIONAL_IMAGES = 10
+MAX_DESCRIPTION = 5000
+
+# символы, недопустимые в XML 1.0 (встречаются во вставленных из Word описаниях)
+INVALID_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _absolute(url):
+    return f'{settings.SITE_URL}{url}' if url.startswith('/') else url
+
+
+def _money(value):
+    return f'{value:.2f} {settings.FEED_CURRENCY}'
+
+
+def feed_rows():
+    queryset = (
+        Product.objects.filter(is_available=True)
+        .order_by('id')
+        .prefetch_related('images')
+    )
+    for product in queryset.iterator(chunk_size=settings.FEED_CHUNK_SIZE):
+        gallery = [image_url(img.image) for img in product.images.all() if img.image]
+        yield {
+            'id': product.sku or str(product.pk),
+            'title': product.title,
+            'description': (product.description or product.title)[:MAX_DESCRIPTION],
+            'link': _absolute(reverse('product_detail', args=[product.pk])),
+            'image_link': _absolute(image_url(product.image)) if product.image else '',
+            'additional_image_link': [_absolute(url) for url in gallery[:MAX_ADDITIONAL_IMAGES]],
+            'availability': 'in_stock' if product.stock > 0 else 'out_of_stock',
+            'price': _money(product.price),
+            'sale_price': _money(product.discount_price) if product.discount_price else '',
+            'brand': product.brand or '',
+            'mpn': product.model_name or product.sku or '',
+            'condition': product.condition,
+        }
+
+
+def _chunked(lines):
+    # склеиваем строки в куски по FEED_CHUNK_SIZE товаров, а не отдаём по одной
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= settings.FEED_CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _xml_item(row):
+    parts = ['<item>']
+    for column in FEED_COLUMNS:
+        values = row[column] if isinstance(row[column], list) else [row[column]]
+        for value in values:
+            if value:
+                parts.append(f'<g:{column}>{escape(INVALID_XML_RE.sub("", value))}</g:{column}>')
+    parts.append('</item>\n')
+    return ''.join(parts)
+
+
+def xml_feed():
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0"><channel>\n'
+        f'<title>Folik</title><link>{escape(settings.SITE_URL)}</link>'
+        '<description>Folik catalog</description>\n'
+    ).encode()
+    yield from _chunked(_xml_item(row) for row in feed_rows())
+    yield b'</channel></rss>\n'
+
+
+class _Echo:
+    # csv.writer пишет в "файл", который просто возвращает строку
+    def write(self, value):
+        return value
+
+
+def csv_feed():
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FEED_COLUMNS).encode()
+    yield from _chunked(
+        writer.writerow([
+            ','.join(row[column]) if isinstance(row[column], list) else row[column]
+            for column in FEED_COLUMNS
+        ])
+        for row in feed_rows()
+    )
+
+
+FEED_WRITERS = {
+    'xml': xml_feed,
+    'csv': csv_feed,
+}
+
+
+# =====================
+# ГОТОВЫЕ ФАЙЛЫ ФИДА
+# =====================
+def feed_path(fmt, version=None):
+    if version is None:
+        version = catalog_version()
+    return os.path.join(settings.FEED_ROOT, f'catalog-{version}.{fmt}')
+
+
+def _version_of(path):
+    match = FEED_FILE_RE.search(os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+def stream_feed(fmt, version=None):
+    """
+    Отдаёт куски фида и параллельно пишет их во временный файл; целиком
+    выгруженный фид атомарно становится файлом своей версии, а файлы более
+    старых версий удаляются. Оборванная выгрузка файла не оставляет.
+    """
+    if version is None:
+        version = catalog_version()
+    path = feed_path(fmt, version)
+    os.makedirs(settings.FEED_ROOT, exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, 'wb') as fh:
+            for chunk in FEED_WRITERS[fmt]():
+                fh.write(chunk)
+                yield chunk
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # только старше своей: процесс с ещё не обновлённой копией версии
+    # не должен удалять файл, который cron уже выгрузил для новой
+    for old in glob.glob(os.path.join(settings.FEED_ROOT, f'catalog-*.{fmt}')):
+        old_version = _version_of(old)
+        if old_version is not None and old_version < version:
+            try:
+                os.remove(old)
+            except FileNotFoundError:  # уже удалил параллельный процесс
+                pass
+
+
+def read_feed_file(fh):
+    with fh:
+        while chunk := fh.read(FILE_BLOCK_SIZE):
+            yield chunk
+
+
+async def aiterate(iterator):
+    """
+    Синхронный итератор кусков → асинхронный для StreamingHttpResponse под ASGI.
+    Иначе Django собирает sync-итератор в список целиком (sync_to_async(list)),
+    и фид/файл оказывается в памяти полностью. Каждый next() идёт в тот же поток
+    (thread_sensitive), так что курсор ORM между кусками не теряется.
+    """
+    sentinel = object()
+    try:
+        while (chunk := await sync_to_async(next)(iterator, sentinel)) is not sentinel:
+            yield chunk
+    finally:
+        # клиент оборвал загрузку — закрываем генератор (stream_feed уберёт временный файл)
+        await sync_to_async(iterator.close)()
+
+
+def build_feed(fmt):
+    version = catalog_version()
+    for _ in stream_feed(fmt, version):
+        pass
+    return feed_path(fmt, version)
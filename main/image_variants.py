@@ -0,0 +1,83 @@
+import base64
+import hashlib
+import io
+import os
+
+from PIL import Image, ImageFilter, ImageOps, features
+
+
+# =====================
+# УМЕНЬШЕННЫЕ КОПИИ ЛОКАЛЬНЫХ КАРТИНОК
+# =====================
+# Без Cloudinary оригиналы .avif лежат в MEDIA_ROOT и отдаются в полном размере.
+# Команда build_image_variants заранее нарезает из них WebP/AVIF нужных ширин
+# и крошечную размытую заглушку (LQIP). Модуль не импортирует Django:
+# build_variants выполняется в процессах пула и получает только пути и числа.
+VARIANT_FORMATS = ('avif', 'webp')
+VARIANT_QUALITY = {'avif': 50, 'webp': 75}
+LQIP_WIDTH = 16
+HASH_CHUNK = 1024 * 1024
+
+
+def available_formats():
+    return tuple(fmt for fmt in VARIANT_FORMATS if features.check(fmt))
+
+
+def content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_name(digest, width, fmt):
+    # имя от содержимого: новый файл — новый URL, старые копии можно кешировать навсегда
+    return f'{digest[:2]}/{digest[:16]}-{width}.{fmt}'
+
+
+def _open(path):
+    image = Image.open(path)
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _lqip(image):
+    height = max(1, round(image.height * LQIP_WIDTH / image.width))
+    small = image.resize((LQIP_WIDTH, height), Image.Resampling.BILINEAR).filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    small.save(buffer, 'WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def build_variants(task):
+    """
+    task — (source, path, digest, out_dir, widths, formats).
+    Возвращает (source, result, error); result — словарь для LocalImage:
+    размеры оригинала, {формат: {ширина: путь относительно out_dir}} и LQIP.
+    """
+    source, path, digest, out_dir, widths, formats = task
+    try:
+        image = _open(path)
+        # шире оригинала не растягиваем, но ширина оригинала всегда есть в наборе
+        targets = sorted({w for w in widths if w < image.width} | {min(image.width, max(widths))})
+        variants = {fmt: {} for fmt in formats}
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                name = variant_name(digest, width, fmt)
+                target = os.path.join(out_dir, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                resized.save(target, fmt.upper(), quality=VARIANT_QUALITY[fmt])
+                variants[fmt][str(width)] = name
+        return source, {
+            'width': image.width,
+            'height': image.height,
+            'variants': variants,
+            # у картинок с прозрачностью заглушка проступала бы сквозь фон
+            'lqip': '' if image.mode == 'RGBA' else _lqip(image),
+        }, None
+    except Exception as exc:  # битый файл не должен ронять весь пул
+        return source, None, f'{type(exc).__name__}: {exc}'
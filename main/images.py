@@ -0,0 +1,150 @@
+import time
+from functools import lru_cache
+
+from django.conf import settings
+
+
+# =====================
+# АДАПТИВНЫЕ КАРТИНКИ (Cloudinary)
+# =====================
+# Вместо оригинала в полном размере отдаём набор ширин через srcset:
+# Cloudinary сам ресайзит (c_limit) и выбирает формат/качество (f_auto, q_auto).
+# Сборка URL — чистая функция от полей ресурса, поэтому кешируется в памяти процесса.
+CARD_WIDTHS = (200, 300, 400, 600)
+THUMB_WIDTHS = (80, 160)
+CART_WIDTHS = (120, 240)
+DETAIL_WIDTHS = (400, 800, 1200)
+
+
+@lru_cache(maxsize=8192)
+def _build_url(public_id, version, fmt, upload_type, resource_type, width):
+    from cloudinary import CloudinaryResource
+
+    resource = CloudinaryResource(
+        public_id, format=fmt, version=version, type=upload_type, resource_type=resource_type
+    )
+    options = {'quality': 'auto', 'fetch_format': 'auto'}
+    if width:
+        options.update(width=width, crop='limit')
+    return resource.build_url(**options)
+
+
+def image_url(image, width=None):
+    if not image:
+        return ''
+    if settings.LOCAL_IMAGES:
+        return local_image_url(image, width)
+    public_id = getattr(image, 'public_id', None)
+    if public_id is None:
+        # не Cloudinary-ресурс (например, строка или локальный файл)
+        return getattr(image, 'url', str(image))
+    return _build_url(
+        public_id,
+        getattr(image, 'version', None),
+        getattr(image, 'format', None),
+        getattr(image, 'type', 'upload'),
+        getattr(image, 'resource_type', 'image'),
+        width,
+    )
+
+
+def image_srcset(image, widths, fmt='webp'):
+    if settings.LOCAL_IMAGES:
+        return local_image_srcset(image, widths, fmt)
+    return ', '.join(f'{image_url(image, width)} {width}w' for width in widths)
+
+
+# =====================
+# ЛОКАЛЬНЫЕ КАРТИНКИ (без Cloudinary)
+# =====================
+# Оригиналы лежат в MEDIA_ROOT, копии нужных ширин и LQIP готовит команда
+# build_image_variants (main/image_variants.py) и записывает в LocalImage.
+# Таблица целиком держится в памяти процесса и перечитывается, когда меняется
+# версия каталога; саму версию проверяем не чаще раза в VARIANTS_CHECK_INTERVAL.
+# Картинка без готовых копий отдаётся оригиналом, как раньше.
+VARIANTS_CHECK_INTERVAL = 5
+_local = {'version': None, 'checked': 0.0, 'images': {}}
+
+
+def image_source(image):
+    """Путь оригинала относительно MEDIA_ROOT."""
+    public_id = getattr(image, 'public_id', None)
+    if public_id is None:
+        return getattr(image, 'name', None) or str(image)
+    fmt = getattr(image, 'format', None)
+    return f'{public_id}.{fmt}' if fmt else public_id
+
+
+def _local_rows():
+    from .models import LocalImage
+
+    return LocalImage.objects.values_list('source', 'variants', 'lqip')
+
+
+def _due_for_check():
+    now = time.monotonic()
+    if now - _local['checked'] < VARIANTS_CHECK_INTERVAL:
+        return False
+    _local['checked'] = now
+    return True
+
+
+def _store_local(version, rows):
+    _local['images'] = {source: (variants, lqip) for source, variants, lqip in rows}
+    _local['version'] = version
+
+
+def local_images():
+    from .caching import catalog_version
+
+    if _due_for_check():
+        version = catalog_version()
+        if version != _local['version']:
+            _store_local(version, _local_rows())
+    return _local['images']
+
+
+async def aload_local_images():
+    """Для async-вьюх: обновить таблицу копий до рендера, чтобы шаблон не ходил в БД."""
+    from .caching import acatalog_version
+
+    if settings.LOCAL_IMAGES and _due_for_check():
+        version = await acatalog_version()
+        if version != _local['version']:
+            _store_local(version, [row async for row in _local_rows()])
+
+
+def _local_variants(image, fmt):
+    variants, _ = local_images().get(image_source(image), ({}, ''))
+    return {int(width): name for width, name in variants.get(fmt, {}).items()}
+
+
+def _variant_url(name):
+    return f'{settings.MEDIA_URL}{settings.IMAGE_VARIANTS_DIR}/{name}'
+
+
+def _pick_width(available, width):
+    # самая узкая копия не уже запрошенной, иначе самая широкая из есть
+    return next((w for w in sorted(available) if w >= width), max(available))
+
+
+def local_image_url(image, width=None, fmt='webp'):
+    variants = _local_variants(image, fmt)
+    if not variants or not width:
+        return f'{settings.MEDIA_URL}{image_source(image)}'
+    return _variant_url(variants[_pick_width(variants, width)])
+
+
+def local_image_srcset(image, widths, fmt='webp'):
+    variants = _local_variants(image, fmt)
+    if not variants:
+        return ''
+    picked = sorted({_pick_width(variants, width) for width in widths})
+    return ', '.join(f'{_variant_url(variants[w])} {w}w' for w in picked)
+
+
+def image_placeholder(image):
+    """data: URI размытой заглушки или пустая строка."""
+    if not image or not settings.LOCAL_IMAGES:
+        return ''
+    return local_images().get(image_source(image), ({}, ''))[1]
@@ -0,0 +1,151 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, Order
+
+
+# =====================
+# ОЧЕРЕДЬ ФОНОВЫХ ЗАДАЧ
+# =====================
+# Работа после заказа (уведомления, подтверждения, выгрузка в CRM) не должна
+# удлинять оформление. enqueue() пишет строку Job в транзакции вызывающего
+# кода: заказ и его задачи фиксируются или откатываются вместе, брокер не нужен.
+#
+# Воркер (команда run_jobs) берёт пачку готовых задач через
+# select_for_update(skip_locked=True) — параллельные воркеры не ждут друг друга
+# и не берут одно и то же — и сдвигает им run_at на время аренды LEASE.
+# Задачи выполняются уже вне транзакции. Если воркер умер посреди пачки, аренда
+# истекает и задачу берёт следующий: доставка "хотя бы один раз", поэтому
+# задача должна спокойно переносить повтор. Ошибка — новая попытка через
+# удваивающуюся паузу, после MAX_ATTEMPTS попыток — статус failed (видно в админке).
+# Задача, которая роняет или вешает воркер, до run_job не доходит: её аренда
+# истекает с исчерпанными попытками, и claim помечает её failed, а не берёт снова.
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=2)
+ERROR_LIMIT = 4000  # хвост traceback в last_error
+
+log = logging.getLogger('main.jobs')
+
+TASKS = {}
+
+
+class WorkResult:
+    def __init__(self, claimed=0, done=0, retried=0, failed=0):
+        self.claimed = claimed
+        self.done = done
+        self.retried = retried
+        self.failed = failed
+
+
+def task(name):
+    """Регистрирует функцию как задачу очереди; аргументы — ключи payload."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, delay=None):
+    """Ставит задачу в очередь в текущей транзакции (откат заказа — откат и задачи)."""
+    if name not in TASKS:
+        raise ValueError(f'Неизвестная задача: {name}')
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def backoff(attempt):
+    # 30 с, 1 мин, 2 мин, ... до BACKOFF_MAX; разброс, чтобы повторы не шли стаей
+    delay = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX)
+    return delay * random.uniform(1.0, 1.2)
+
+
+def claim(batch):
+    now = timezone.now()
+    with transaction.atomic():
+        expired = Job.objects.filter(status=Job.PENDING, run_at__lte=now, attempts__gte=MAX_ATTEMPTS).update(
+            status=Job.FAILED,
+            last_error=f'Аренда истекла после {MAX_ATTEMPTS} попыток: воркер упал или завис на этой задаче',
+            finished_at=now,
+        )
+        if expired:
+            log.error('Задач с истёкшей арендой после %s попыток: %s', MAX_ATTEMPTS, expired)
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, run_at__lte=now)
+            .order_by('run_at', 'id')[:batch]
+        )
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                run_at=now + LEASE,
+                attempts=F('attempts') + 1,
+            )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job):
+    """Выполняет взятую задачу; → 'done', 'retried' или 'failed'."""
+    try:
+        TASKS[job.name](**job.payload)
+    except Exception:
+        error = traceback.format_exc()[-ERROR_LIMIT:]
+        if job.attempts >= MAX_ATTEMPTS:
+            Job.objects.filter(id=job.id).update(status=Job.FAILED, last_error=error, finished_at=timezone.now())
+            log.error('Задача %s #%s не выполнена после %s попыток:\n%s', job.name, job.id, job.attempts, error)
+            return 'failed'
+        Job.objects.filter(id=job.id).update(run_at=timezone.now() + backoff(job.attempts), last_error=error)
+        log.warning('Задача %s #%s, попытка %s: %s', job.name, job.id, job.attempts, error.strip().splitlines()[-1])
+        return 'retried'
+    Job.objects.filter(id=job.id).update(status=Job.DONE, last_error='', finished_at=timezone.now())
+    return 'done'
+
+
+def work(batch=20):
+    """Одна пачка: взять до batch готовых задач и выполнить их по очереди."""
+    jobs = claim(batch)
+    result = WorkResult(claimed=len(jobs))
+    for job in jobs:
+        outcome = run_job(job)
+        setattr(result, outcome, getattr(result, outcome) + 1)
+    return result
+
+
+def purge_finished(days):
+    """Удаляет выполненные задачи старше days дней; упавшие остаются для разбора."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+# =====================
+# ЗАДАЧИ
+# =====================
+@task('order_placed')
+def notify_order(order_id):
+    """Письмо менеджерам о новом заказе (ORDER_NOTIFY_EMAILS); без адресов — только запись в лог."""
+    order = Order.objects.prefetch_related('items__product').filter(id=order_id).first()
+    if order is None:
+        return  # заказ удалили раньше, чем дошла очередь
+    subject = f'Новый заказ #{order.id} на {order.total} ₴'
+    lines = [
+        f'{item.product.title if item.product else "(товар удалён)"} × {item.quantity} — {item.price} ₴'
+        for item in order.items.all()
+    ]
+    body = '\n'.join([f'{order.full_name}, {order.phone}', '', *lines, '', f'Итого: {order.total} ₴'])
+    if settings.ORDER_NOTIFY_EMAILS:
+        send_mail(subject, body, None, settings.ORDER_NOTIFY_EMAILS)
+    log.info(subject)
@@ -0,0 +1,102 @@
+import os
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.caching import bump_catalog_version
+from main.image_variants import available_formats, build_variants, content_hash
+from main.images import CARD_WIDTHS, CART_WIDTHS, DETAIL_WIDTHS, THUMB_WIDTHS, image_source
+from main.models import LocalImage, Product, ProductImage
+
+VARIANT_WIDTHS = tuple(sorted(set(CARD_WIDTHS + THUMB_WIDTHS + CART_WIDTHS + DETAIL_WIDTHS)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит уменьшенные WebP/AVIF-копии и LQIP-заглушки для Product.image и ProductImage.image '
+        'из MEDIA_ROOT (для работы без Cloudinary). Картинки с неизменившимся содержимым пропускаются. '
+        'Пример для CI: python manage.py build_image_variants --workers 4'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help='пересобрать всё, даже без изменений')
+        parser.add_argument('--prune', action='store_true', help='удалить копии картинок, которых больше нет')
+
+    def handle(self, *args, **options):
+        formats = available_formats()
+        if not formats:
+            self.stderr.write('Pillow собран без поддержки WebP и AVIF')
+            return
+        out_dir = os.path.join(settings.MEDIA_ROOT, settings.IMAGE_VARIANTS_DIR)
+        existing = {record.source: record for record in LocalImage.objects.all()}
+
+        sources = set()
+        for model in (Product, ProductImage):
+            for image in model.objects.exclude(image__isnull=True).exclude(image='').values_list('image', flat=True):
+                sources.add(image_source(image))
+
+        tasks = []
+        digests = {}
+        missing = 0
+        for source in sorted(sources):
+            path = os.path.join(settings.MEDIA_ROOT, source)
+            if not os.path.isfile(path):
+                missing += 1
+                continue
+            digest = digests[source] = content_hash(path)
+            if options['force'] or not self._up_to_date(existing.get(source), digest, formats, out_dir):
+                tasks.append((source, path, digest, out_dir, VARIANT_WIDTHS, formats))
+
+        built = failed = 0
+        for source, result, error in self._run(tasks, options['workers']):
+            if error:
+                failed += 1
+                self.stderr.write(f'{source}: {error}')
+                continue
+            LocalImage.objects.update_or_create(source=source, defaults={'content_hash': digests[source], **result})
+            built += 1
+
+        pruned = self._prune(sources, out_dir) if options['prune'] else 0
+        if built or pruned:
+            # в закешированных страницах каталога остались старые URL картинок
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: собрано {built}, без изменений {len(sources) - missing - len(tasks)}, '
+            f'ошибок {failed}, нет файла {missing}, удалено {pruned}'
+        ))
+
+    def _up_to_date(self, record, digest, formats, out_dir):
+        if record is None or record.content_hash != digest:
+            return False
+        for fmt in formats:
+            names = record.variants.get(fmt)
+            if not names or not all(os.path.isfile(os.path.join(out_dir, name)) for name in names.values()):
+                return False
+        return True
+
+    def _run(self, tasks, workers):
+        if workers <= 1 or len(tasks) <= 1:
+            yield from map(build_variants, tasks)
+            return
+        # кодирование AVIF упирается в CPU — раскладываем картинки по процессам,
+        # результаты записываем по мере готовности
+        with Pool(min(workers, len(tasks))) as pool:
+            yield from pool.imap_unordered(build_variants, tasks)
+
+    def _prune(self, sources, out_dir):
+        removed, _ = LocalImage.objects.exclude(source__in=sources).delete()
+        used = {
+            name
+            for variants in LocalImage.objects.values_list('variants', flat=True)
+            for names in variants.values()
+            for name in names.values()
+        }
+        for root, _, files in os.walk(out_dir):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), out_dir).replace(os.sep, '/')
+                if name not in used:
+                    os.remove(os.path.join(root, filename))
+        return removed
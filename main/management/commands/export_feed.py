@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.feeds import FEED_WRITERS, build_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает фид каталога (Google Merchant XML или CSV). Без --output кладёт файл '
+        'текущей версии каталога в FEED_ROOT, откуда его отдаёт /feed.<формат>. '
+        'Пример для cron: */30 * * * * python manage.py export_feed --format xml'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FEED_WRITERS), default='xml')
+        parser.add_argument('--output', help='путь к файлу или "-" для stdout')
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        output = options['output']
+        if not output:
+            path = build_feed(fmt)
+            self.stdout.write(self.style.SUCCESS(f'Фид сохранён: {path}'))
+            return
+
+        try:
+            target = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        except OSError as exc:
+            raise CommandError(f'Не удалось открыть {output}: {exc}')
+        try:
+            for chunk in FEED_WRITERS[fmt]():
+                target.write(chunk)
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.catalog_import import BATCH_SIZE, CatalogImportError, import_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует товары из CSV/XLSX (первая строка — имена полей Product, обязательна колонка sku): '
+        'новые sku создаются, существующие обновляются только по колонкам из файла. '
+        'Пример: python manage.py import_catalog prices.xlsx --errors errors.csv'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='только проверить файл, ничего не записывать')
+        parser.add_argument('--errors', help='куда сохранить CSV с ошибками по строкам')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fh:
+                report = import_catalog(fh, options['path'], options['batch_size'], options['dry_run'])
+        except OSError as exc:
+            raise CommandError(f'Не удалось открыть файл: {exc}')
+        except CatalogImportError as exc:
+            raise CommandError(str(exc))
+
+        if report.ignored_columns:
+            self.stderr.write('Пропущены неизвестные колонки: ' + ', '.join(report.ignored_columns))
+        for number, sku, message in report.errors[:20]:
+            self.stderr.write(f'строка {number} ({sku or "без sku"}): {message}')
+        if options['errors'] and report.errors:
+            with open(options['errors'], 'w', encoding='utf-8', newline='') as fh:
+                fh.write(report.errors_csv())
+
+        verb = 'Будет' if options['dry_run'] else 'Готово'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: создано {report.created}, обновлено {report.updated}, '
+            f'без изменений {report.unchanged}, ошибок {len(report.errors)}'
+        ))
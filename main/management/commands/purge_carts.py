@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from main.models import CartItem
+
+DB_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истёкшие сессии и брошенные позиции корзины (CartItem без живой сессии) '
+        'небольшими пачками, чтобы не держать долгих блокировок. Пример для cron: '
+        '0 4 * * * python manage.py purge_carts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=0, help='0 — без ограничения')
+        parser.add_argument('--sleep', type=float, default=0.0, help='пауза между пачками, сек')
+        parser.add_argument('--dry-run', action='store_true', help='только посчитать')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.max_batches = options['max_batches']
+        self.sleep = options['sleep']
+        self.dry_run = options['dry_run']
+
+        if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+            self.stderr.write('Сессии хранятся не в БД — чистим только позиции без session_key')
+            sessions = 0
+            orphaned = Q(session_key__isnull=True)
+        else:
+            now = timezone.now()
+            sessions = self._purge(Session.objects.filter(expire_date__lt=now), 'session_key')
+            # позиции, у которых нет живой сессии (истекла, удалена или её не было)
+            alive = Session.objects.filter(expire_date__gte=now).values('session_key')
+            orphaned = Q(session_key__isnull=True) | ~Q(session_key__in=alive)
+
+        cart_items = self._purge(CartItem.objects.filter(orphaned), 'id')
+
+        verb = 'Будет удалено' if self.dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{verb}: сессий {sessions}, позиций корзины {cart_items}'))
+
+    def _purge(self, queryset, pk_field):
+        if self.dry_run:
+            return queryset.count()
+
+        model = queryset.model
+        removed = 0
+        batches = 0
+        while True:
+            # выбираем ключи пачки отдельно: DELETE по первичному ключу короткий и не сканирует таблицу
+            keys = list(queryset.values_list(pk_field, flat=True)[:self.batch_size])
+            if not keys:
+                break
+            model.objects.filter(**{f'{pk_field}__in': keys}).delete()
+            removed += len(keys)
+            batches += 1
+            if self.max_batches and batches >= self.max_batches:
+                break
+            if self.sleep:
+                time.sleep(self.sleep)
+        return removed
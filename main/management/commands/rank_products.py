@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main.ranking import rank_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает featured_score товаров по продажам, остатку, скидке, новизне и is_featured '
+        '(веса — settings.RANKING). По умолчанию только товары с новыми или выпавшими из окна продажами '
+        'и с изменёнными ценой, скидкой, остатком или is_featured. Пример для cron: '
+        '*/10 * * * * python manage.py rank_products; 30 3 * * * python manage.py rank_products --full'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='пересчитать все товары')
+        parser.add_argument('--dry-run', action='store_true', help='только посчитать')
+
+    def handle(self, *args, **options):
+        result = rank_products(full=options['full'], dry_run=options['dry_run'])
+        verb = 'Будет изменено' if options['dry_run'] else 'Изменено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчёт ({result.mode}): просмотрено {result.scanned}, {verb.lower()} {result.changed}'
+        ))
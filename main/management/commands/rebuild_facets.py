@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from main.facets import rebuild_facet_counts
+from main.models import FacetCount, Product
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает счётчики фасетов каталога (FacetCount)'
+
+    def handle(self, *args, **options):
+        total = rebuild_facet_counts(Product, FacetCount)
+        self.stdout.write(self.style.SUCCESS(f'Фасетов пересчитано: {total}'))
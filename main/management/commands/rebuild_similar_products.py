@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from main.similarity import rebuild_similar_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает "Схожі моделі" (SimilarProduct) по характеристикам и цене, веса — settings.SIMILARITY. '
+        'По умолчанию только изменившиеся товары и их соседи. Пример для cron: '
+        '*/15 * * * * python manage.py rebuild_similar_products; 0 4 * * 0 python manage.py rebuild_similar_products --full'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='пересчитать все товары')
+        parser.add_argument('--dry-run', action='store_true', help='только посчитать, сколько товаров затронуто')
+
+    def handle(self, *args, **options):
+        result = rebuild_similar_products(full=options['full'], dry_run=options['dry_run'])
+        verb = 'будет пересчитано' if options['dry_run'] else 'пересчитано'
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие ({result.mode}): товаров {result.products}, изменилось {result.changed}, {verb} {result.recomputed}'
+        ))
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmark import SCENARIOS, run_benchmark, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все URL из main/urls.py через тестовый клиент (p50/p95/p99, SQL на запрос, память) '
+        'и, по желанию, нагрузку в несколько потоков; отчёт — JSON для сравнения прогонов. Пример: '
+        'python manage.py run_benchmark --load 2000 --concurrency 8 --output bench/$(git rev-parse --short HEAD).json'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', dest='urls', choices=sorted(SCENARIOS),
+                            help='только эти сценарии (можно несколько раз)')
+        parser.add_argument('--requests', type=int, default=20, help='замеров на URL')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--load', type=int, default=0, help='запросов в нагрузочном прогоне (0 — без него)')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--base-url', help='нагружать запущенный сервер по HTTP, например http://127.0.0.1:8000')
+        parser.add_argument('--output', default='-', help="файл отчёта или '-' (stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmark(
+                names=options['urls'],
+                requests=options['requests'],
+                warmup=options['warmup'],
+                load_requests=options['load'],
+                concurrency=options['concurrency'],
+                base_url=options['base_url'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['output'] == '-':
+            write_report(report, sys.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            write_report(report, fh)
+        for name, stats in report['urls'].items():
+            self.stdout.write(
+                f"{name:20} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+                f"p99 {stats['p99_ms']:8.1f} ms  SQL {stats['queries_mean']:5.1f}  {stats['status']}"
+            )
+        if report['uncovered_urls']:
+            self.stderr.write('Без сценария: ' + ', '.join(report['uncovered_urls']))
+        self.stdout.write(self.style.SUCCESS(f"Отчёт: {options['output']}"))
@@ -0,0 +1,48 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main.jobs import purge_finished, work
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер очереди фоновых задач (Job): берёт готовые задачи пачками и выполняет их. '
+        'Постоянно: python manage.py run_jobs; из cron: * * * * * python manage.py run_jobs --once'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='выполнить всё, что готово сейчас, и выйти')
+        parser.add_argument('--batch', type=int, default=20, help='задач за одну выборку (по умолчанию 20)')
+        parser.add_argument('--sleep', type=float, default=2.0, help='пауза, когда очередь пуста, секунд (по умолчанию 2)')
+        parser.add_argument('--keep-days', type=int, default=7, help='сколько дней хранить выполненные задачи (по умолчанию 7)')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # SIGTERM при деплое: дорабатываем текущую пачку и выходим
+        signal.signal(signal.SIGTERM, self._stop)
+
+        purged = purge_finished(options['keep_days'])
+        if purged:
+            self.stdout.write(f'Удалено выполненных задач: {purged}')
+
+        while not self.stopping:
+            # долгоживущий процесс: соединение проверяется так же, как между запросами
+            close_old_connections()
+            result = work(options['batch'])
+            if result.claimed:
+                self.stdout.write(
+                    f'Задач: {result.claimed}, выполнено {result.done}, '
+                    f'на повтор {result.retried}, с ошибкой {result.failed}'
+                )
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
+        if self.stopping:
+            self.stdout.write(self.style.SUCCESS('Воркер остановлен по SIGTERM'))
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmark import clear_benchmark_data, generate_benchmark_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД тестовыми данными для бенчмарка (seed — одинаковые данные на каждом запуске): '
+        'товары с фото, корзины, заказы за год. Только для отдельной БД, не для прода. Пример: '
+        'DATABASE_URL=sqlite:///bench.sqlite3 python manage.py seed_benchmark_data --clear'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--images', type=int, default=2, help='фото на товар')
+        parser.add_argument('--cart-items', type=int, default=1_000_000)
+        parser.add_argument('--orders-per-day', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='сначала удалить прошлые тестовые данные')
+        parser.add_argument('--clear-only', action='store_true', help='только удалить тестовые данные')
+        parser.add_argument('--force', action='store_true', help='разрешить при DEBUG=False')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('DEBUG=False — похоже на прод. Запустите с --force, если БД точно тестовая.')
+
+        if options['clear'] or options['clear_only']:
+            deleted = clear_benchmark_data()
+            self.stdout.write(f'Удалено тестовых товаров: {deleted}')
+            if options['clear_only']:
+                return
+
+        started = time.perf_counter()
+        data = generate_benchmark_data(
+            products=options['products'],
+            images_per_product=options['images'],
+            cart_items=options['cart_items'],
+            orders_per_day=options['orders_per_day'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано за {time.perf_counter() - started:.1f} с: товаров {data.products}, фото {data.images}, '
+            f'строк корзин {data.cart_items}, заказов {data.orders} ({data.order_items} позиций)'
+        ))
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.db_router import REPLICA_DB_ALIAS, replica_enabled
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-БД в файл реплики — для локальной проверки чтений с реплики. '
+        'Пример: REPLICA_DATABASE_URL=sqlite:///replica.sqlite3 python manage.py sync_sqlite_replica'
+    )
+
+    def handle(self, *args, **options):
+        if not replica_enabled():
+            raise CommandError('REPLICA_DATABASE_URL не задан')
+        primary = settings.DATABASES['default']
+        replica = settings.DATABASES[REPLICA_DB_ALIAS]
+        if primary['ENGINE'] != SQLITE_ENGINE or replica['ENGINE'] != SQLITE_ENGINE:
+            raise CommandError('Команда только для SQLite; реплику PostgreSQL ведёт сам сервер')
+
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            # backup API даёт согласованную копию даже при идущих записях
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f'Реплика обновлена: {replica["NAME"]}'))
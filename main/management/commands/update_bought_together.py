@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from main.copurchase import update_bought_together
+
+
+class Command(BaseCommand):
+    help = (
+        'Добавляет в счётчики "Разом купують" (ProductPair) пары товаров из новых заказов '
+        '(после водяного знака). Пример для cron: */10 * * * * python manage.py update_bought_together'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='обнулить счётчики и пройти всю историю заказов')
+
+    def handle(self, *args, **options):
+        result = update_bought_together(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Разом купують ({result.mode}): заказов {result.orders}, пар обновлено {result.pairs}'
+        ))
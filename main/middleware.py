@@ -0,0 +1,116 @@
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from . import perf
+from .db_router import replica_reads
+
+
+# =====================
+# WHITENOISE ДЛЯ ASGI
+# =====================
+# Штатный WhiteNoiseMiddleware только синхронный: под ASGI Django из-за него
+# переводит всю цепочку (и async-вьюхи) в поток. Здесь та же логика, но
+# с async-веткой: статика ищется в словаре в памяти, остальное уходит дальше
+# без смены контекста.
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self._is_async = iscoroutinefunction(get_response)
+        if self._is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+# =====================
+# ЧТЕНИЯ КАТАЛОГА С РЕПЛИКИ
+# =====================
+# Отмечает безопасные запросы вне админки: только в них PrimaryReplicaRouter
+# отправляет чтения каталога на реплику (main/db_router.py).
+class ReplicaReadsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._is_async = iscoroutinefunction(get_response)
+        if self._is_async:
+            markcoroutinefunction(self)
+
+    def _allow_replica(self, request):
+        return request.method in ('GET', 'HEAD') and not request.path_info.startswith('/admin/')
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        token = replica_reads.set(self._allow_replica(request))
+        try:
+            return self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+    async def __acall__(self, request):
+        token = replica_reads.set(self._allow_replica(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+
+# =====================
+# SERVER-TIMING
+# =====================
+# Замеряет долю PERF_SAMPLE_RATE запросов (main/perf.py): SQL, шаблоны,
+# картинки и общее время. Стоит первым, чтобы app покрывал всю цепочку.
+# Вне выборки — одно сравнение со случайным числом.
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PERF_SAMPLE_RATE
+        self.slow_ms = settings.PERF_SLOW_REQUEST_MS
+        self._is_async = iscoroutinefunction(get_response)
+        if self._is_async:
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        # уже замеряется снаружи (команда run_benchmark) — не перехватываем счётчики
+        if perf.current() is not None:
+            return False
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        token = perf.start()
+        response = self.get_response(request)
+        return perf.finish(token, request, response, self.slow_ms)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        token = perf.start()
+        response = await self.get_response(request)
+        return perf.finish(token, request, response, self.slow_ms)
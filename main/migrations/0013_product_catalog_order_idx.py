@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_alter_product_image_alter_productimage_image'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ['-featured_score', '-is_featured', '-created_at', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', '-featured_score', '-is_featured', '-created_at', 'id'], name='product_catalog_order_idx'),
+        ),
+    ]
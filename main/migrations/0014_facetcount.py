@@ -0,0 +1,93 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:30
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+# снимок правил main/facets.py на момент миграции: дальнейшие правки модуля
+# не должны менять то, что эта миграция делает на чистой установке
+FACET_FIELDS = ('brand', 'cpu', 'ram_gb', 'storage_gb', 'storage_type', 'gpu', 'condition', 'operating_system')
+INT_FACETS = ('ram_gb', 'storage_gb')
+PRICE_BUCKETS = ((0, 10000), (10000, 20000), (20000, 40000), (40000, None))
+
+
+def fill_facet_counts(apps, schema_editor):
+    Product = apps.get_model('main', 'Product')
+    FacetCount = apps.get_model('main', 'FacetCount')
+    counts = {}
+    rows = Product.objects.filter(is_available=True).values_list('price', 'discount_price', *FACET_FIELDS)
+    for price, discount_price, *values in rows.iterator(chunk_size=2000):
+        pairs = set()
+        for name, value in zip(FACET_FIELDS, values):
+            if name in INT_FACETS:
+                if value:
+                    pairs.add((name, str(value)))
+            elif value and str(value).strip():
+                pairs.add((name, str(value).strip()))
+        effective = discount_price or price
+        for low, high in PRICE_BUCKETS:
+            if effective >= low and (high is None or effective < high):
+                pairs.add(('price', f'{low}-{high}' if high is not None else f'{low}-'))
+                break
+        for pair in pairs:
+            counts[pair] = counts.get(pair, 0) + 1
+    FacetCount.objects.bulk_create(
+        [FacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_product_catalog_order_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=40)),
+                ('value', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'brand'], name='product_brand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'cpu'], name='product_cpu_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'gpu'], name='product_gpu_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'ram_gb'], name='product_ram_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'storage_gb', 'storage_type'], name='product_storage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'condition'], name='product_condition_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'operating_system'], name='product_os_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('discount_price', 'price'), name='product_effective_price_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value'),
+        ),
+        migrations.RunPython(fill_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:05
+
+from django.db import migrations
+
+
+# SQL — снимок main/search.py на момент миграции (модуль может меняться дальше)
+SEARCH_COLUMNS = 'title, brand, model_name, sku, cpu, gpu, description'
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(model_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(brand, '') || ' ' || coalesce(sku, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(cpu, '') || ' ' || coalesce(gpu, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def create_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS main_product_fts USING fts5({SEARCH_COLUMNS}, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute("DELETE FROM main_product_fts")
+            cursor.execute(
+                f"INSERT INTO main_product_fts (rowid, {SEARCH_COLUMNS}) SELECT id, {SEARCH_COLUMNS} FROM main_product"
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS main_product_search ("
+                "product_id bigint PRIMARY KEY REFERENCES main_product(id) ON DELETE CASCADE, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS main_product_search_gin ON main_product_search USING GIN (document)")
+            cursor.execute(
+                f"INSERT INTO main_product_search (product_id, document) SELECT id, {PG_DOCUMENT} FROM main_product "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document"
+            )
+
+
+def drop_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("DROP TABLE IF EXISTS main_product_fts")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("DROP TABLE IF EXISTS main_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_facetcount'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:33
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def snapshot_prices(apps, schema_editor):
+    # у старых заказов цены не сохранялись — берём текущую цену товара
+    Product = apps.get_model('main', 'Product')
+    OrderItem = apps.get_model('main', 'OrderItem')
+    current = Product.objects.filter(pk=OuterRef('product_id')).values(
+        effective=Coalesce('discount_price', 'price')
+    )[:1]
+    OrderItem.objects.filter(price__isnull=True, product__isnull=False).update(price=Subquery(current))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:33
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    Order = apps.get_model('main', 'Order')
+    OrderItem = apps.get_model('main', 'OrderItem')
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    total = items.annotate(
+        s=Sum(Coalesce('price', 'product__discount_price', 'product__price') * F('quantity'), output_field=money)
+    ).values('s')
+    count = items.annotate(s=Sum('quantity')).values('s')
+    Order.objects.update(
+        total=Coalesce(Subquery(total, output_field=money), Value(0), output_field=money),
+        item_count=Coalesce(Subquery(count), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_orderitem_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Товаров'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12, verbose_name='Итого'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_order_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['session_key', 'product'], name='cartitem_session_product_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_similar_products'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('companion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pair_entries', to='main.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-count'], name='productpair_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'companion'), name='unique_product_pair')],
+            },
+        ),
+    ]
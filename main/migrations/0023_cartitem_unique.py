@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:45
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    # гонки get_or_create оставляли по две строки на товар — складываем количество в первую
+    CartItem = apps.get_model('main', 'CartItem')
+    duplicates = (
+        CartItem.objects.filter(session_key__isnull=False)
+        .values('session_key', 'product')
+        .annotate(lines=Count('id'), quantity=Sum('quantity'), keep=Min('id'))
+        .filter(lines__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        CartItem.objects.filter(id=row['keep']).update(quantity=row['quantity'])
+        CartItem.objects.filter(session_key=row['session_key'], product=row['product']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_product_pairs'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('session_key', 'product'), name='cartitem_session_product_uniq'),
+        ),
+        # уникальное ограничение само по себе индекс с тем же префиксом
+        migrations.RemoveIndex(
+            model_name='cartitem',
+            name='cartitem_session_product_idx',
+        ),
+    ]
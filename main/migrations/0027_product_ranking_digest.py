@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0026_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='ranking_digest',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
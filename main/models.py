@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from cloudinary.models import CloudinaryField
 
@@ -35,11 +37,40 @@ class Product(models.Model):
     # Admin / ranking
     is_featured = models.BooleanField(default=False, help_text='Mark as featured (best products)')
     featured_score = models.FloatField(default=0.0, help_text='Higher means shown earlier in best products')
+    # отпечаток цены, скидки, остатка и is_featured при последнем пересчёте featured_score (main/ranking.py)
+    ranking_digest = models.CharField(max_length=16, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # цена продажи (как get_display_price) хранимой колонкой: фильтр цены в каталоге
+    # (main/facets.py) и индекс product_effective_price_idx работают с одной колонкой,
+    # а не с выражением, которое SQLite компилирует в индексе и в WHERE по-разному
+    effective_price = models.GeneratedField(
+        expression=Coalesce('discount_price', 'price'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
+
     class Meta:
-        ordering = ['-featured_score', '-is_featured', '-created_at']
+        ordering = ['-featured_score', '-is_featured', '-created_at', 'id']
+        indexes = [
+            # keyset-пагинация каталога (см. main/pagination.py); частичный — условие то же,
+            # что у выборки каталога: голое WHERE is_available префикс индекса не использует
+            models.Index(
+                fields=['-featured_score', '-is_featured', '-created_at', 'id'],
+                name='product_catalog_order_idx',
+                condition=Q(is_available=True),
+            ),
+            # фасетные фильтры /products/ (см. main/facets.py)
+            models.Index(fields=['is_available', 'brand'], name='product_brand_idx'),
+            models.Index(fields=['is_available', 'cpu'], name='product_cpu_idx'),
+            models.Index(fields=['is_available', 'gpu'], name='product_gpu_idx'),
+            models.Index(fields=['is_available', 'ram_gb'], name='product_ram_idx'),
+            models.Index(fields=['is_available', 'storage_gb', 'storage_type'], name='product_storage_idx'),
+            models.Index(fields=['is_available', 'condition'], name='product_condition_idx'),
+            models.Index(fields=['is_available', 'operating_system'], name='product_os_idx'),
+            models.Index(fields=['effective_price'], name='product_effective_price_idx', condition=Q(is_available=True)),
+        ]
 
     def __str__(self):
         if self.brand and self.model_name:
@@ -50,6 +81,21 @@ class Product(models.Model):
         return self.discount_price if self.discount_price else self.price
 
 
+# ── СЧЁТЧИКИ ФАСЕТОВ (обновляются сигналами, см. main/facets.py) ──
+class FacetCount(models.Model):
+    facet = models.CharField(max_length=40)
+    value = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value} ({self.count})"
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(
         Product,
@@ -61,6 +107,48 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"Фото для {self.product.title}"
 
+
+# ── УМЕНЬШЕННЫЕ КОПИИ ЛОКАЛЬНЫХ КАРТИНОК (команда build_image_variants, см. main/image_variants.py) ──
+class LocalImage(models.Model):
+    # путь оригинала относительно MEDIA_ROOT, например products/main/11.avif
+    source = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=40)
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    # {"webp": {"200": "ab/abcdef-200.webp", ...}, "avif": {...}}, пути относительно IMAGE_VARIANTS_DIR
+    variants = models.JSONField(default=dict)
+    lqip = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.source
+
+
+# ── ПОХОЖИЕ ТОВАРЫ (команда rebuild_similar_products, см. main/similarity.py) ──
+class ProductVector(models.Model):
+    # отпечаток вектора характеристик: по нему пересчёт находит изменённые товары
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    digest = models.CharField(max_length=16)
+    # расстояние до самого дальнего из сохранённых соседей; пусто — соседей меньше, чем нужно
+    radius = models.FloatField(null=True, blank=True)
+
+
+class SimilarProduct(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    # SET_NULL, а не CASCADE: пустая ссылка — признак, что список товара надо пересчитать
+    similar = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='similar_entries')
+    rank = models.PositiveSmallIntegerField()
+    distance = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # он же индекс для выборки соседей товара по порядку
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_similar_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} → {self.similar_id} (#{self.rank})"
+
 # ── КОРЗИНА (через сессии, без логина) ──
 class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -69,6 +157,12 @@ class CartItem(models.Model):
     # сессия вместо пользователя
     session_key = models.CharField(max_length=40, null=True, blank=True)
 
+    class Meta:
+        # одна строка на товар в корзине: на этом ограничении держится upsert в DatabaseCart.add
+        constraints = [
+            models.UniqueConstraint(fields=['session_key', 'product'], name='cartitem_session_product_uniq'),
+        ]
+
     def get_total_price(self):
         return (self.product.discount_price if self.product.discount_price else self.product.price) * self.quantity
 
@@ -83,17 +177,105 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_processed = models.BooleanField(default=False)
 
+    # денормализованные итоги: считаются при оформлении и пересчитываются
+    # сигналами OrderItem (main/signals.py), списки и отчёты читают одну колонку
+    total = models.DecimalField('Итого', max_digits=12, decimal_places=2, default=0, db_index=True)
+    item_count = models.PositiveIntegerField('Товаров', default=0)
+
     def __str__(self):
         return f"Заказ #{self.id} от {self.full_name}"
 
+    def recalculate_totals(self):
+        totals = self.items.aggregate(
+            total=Sum(
+                Coalesce('price', 'product__discount_price', 'product__price') * F('quantity'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            item_count=Sum('quantity'),
+        )
+        self.total = totals['total'] or 0
+        self.item_count = totals['item_count'] or 0
+        Order.objects.filter(pk=self.pk).update(total=self.total, item_count=self.item_count)
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField(default=1)
+    # цена за единицу на момент заказа (у старых заказов может быть пустой)
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
     def get_total_price(self):
+        if self.price is not None:
+            return self.price * self.quantity
         return (self.product.discount_price if self.product.discount_price else self.product.price) * self.quantity
 
     def __str__(self):
-        return f"{self.product.title} x {self.quantity}"
\ No newline at end of file
+        return f"{self.product.title} x {self.quantity}"
+
+
+# ── "РАЗОМ КУПУЮТЬ": сколько заказов содержали оба товара (команда update_bought_together, см. main/copurchase.py) ──
+class ProductPair(models.Model):
+    # хранится в обе стороны (a→b и b→a): соседи товара — одна выборка по индексу
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    companion = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='pair_entries')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'companion'], name='unique_product_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-count'], name='productpair_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.companion_id}: {self.count}"
+
+
+# ── ВОДЯНЫЕ ЗНАКИ ФОНОВЫХ ПЕРЕСЧЁТОВ: докуда уже обработаны данные (например, id OrderItem);
+#    здесь же общая для всех процессов версия каталога 'catalog:version' (main/caching.py) ──
+class JobWatermark(models.Model):
+    name = models.CharField(max_length=80, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+    @classmethod
+    def read(cls, name):
+        return cls.objects.filter(name=name).values_list('position', flat=True).first() or 0
+
+    @classmethod
+    def advance(cls, name, position):
+        cls.objects.update_or_create(name=name, defaults={'position': position})
+
+
+# ── ОЧЕРЕДЬ ФОНОВЫХ ЗАДАЧ (команда run_jobs, см. main/jobs.py) ──
+class Job(models.Model):
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    name = models.CharField(max_length=80)  # имя задачи в main.jobs.TASKS
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=((PENDING, 'В очереди'), (DONE, 'Выполнена'), (FAILED, 'Ошибка')),
+        default=PENDING,
+    )
+    # не раньше этого времени; взятая воркером задача сдвигается на время аренды
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
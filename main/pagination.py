@@ -0,0 +1,90 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+# =====================
+# KEYSET-ПАГИНАЦИЯ КАТАЛОГА
+# =====================
+# Порядок совпадает с Product.Meta.ordering и индексом product_catalog_order_idx.
+# Курсор хранит значения последней строки страницы, поэтому следующая страница —
+# это один WHERE по индексу без OFFSET: цена запроса не зависит от глубины.
+CATALOG_ORDERING = ('-featured_score', '-is_featured', '-created_at', 'id')
+
+
+def encode_cursor(product):
+    values = [
+        product.featured_score,
+        product.is_featured,
+        product.created_at.isoformat(),
+        product.id,
+    ]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (score, featured, created_at, id) или None для битого курсора."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        score, featured, created_at, pk = json.loads(raw)
+        return float(score), bool(featured), datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def _after(score, featured, created_at, pk):
+    # (a, b, c, d) "после" курсора при DESC, DESC, DESC, ASC; ведущее a <= score —
+    # диапазон, с которого планировщик начинает проход по индексу, а не скан таблицы
+    return Q(featured_score__lte=score) & (
+        Q(featured_score__lt=score)
+        | Q(featured_score=score, is_featured__lt=featured)
+        | Q(featured_score=score, is_featured=featured, created_at__lt=created_at)
+        | Q(featured_score=score, is_featured=featured, created_at=created_at, id__gt=pk)
+    )
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _page_queryset(queryset, cursor, page_size):
+    queryset = queryset.order_by(*CATALOG_ORDERING)
+    position = decode_cursor(cursor)
+    if position is not None:
+        queryset = queryset.filter(_after(*position))
+    # берём на одну строку больше, чтобы узнать, есть ли следующая страница
+    return queryset[:page_size + 1]
+
+
+def _make_page(items, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1])
+    return KeysetPage(items, next_cursor)
+
+
+def paginate_catalog(queryset, cursor=None, page_size=24):
+    return _make_page(list(_page_queryset(queryset, cursor, page_size)), page_size)
+
+
+async def apaginate_catalog(queryset, cursor=None, page_size=24):
+    items = [item async for item in _page_queryset(queryset, cursor, page_size)]
+    return _make_page(items, page_size)
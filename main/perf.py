@@ -0,0 +1,152 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.template.backends.django import DjangoTemplates, Template
+
+
+# =====================
+# ИЗМЕРЕНИЯ ЗАПРОСА (Server-Timing)
+# =====================
+# ServerTimingMiddleware (main/middleware.py) для выбранных запросов кладёт
+# в ContextVar объект RequestTimings; SQL, шаблоны и сборка URL картинок
+# добавляют в него своё время. Вне выборки ContextVar пуст и каждое место
+# замера обходится одной проверкой. ContextVar, а не атрибут request:
+# async-ORM выполняет запросы в другом потоке, а контекст туда копируется.
+MAX_RECORDED_QUERIES = 200
+SLOW_SQL_LIMIT = 20
+
+perf_log = logging.getLogger('main.perf')
+slow_log = logging.getLogger('main.perf.slow')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.queries = []  # (секунды, sql)
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.image_time = 0.0
+
+    def add_query(self, sql, duration):
+        self.db_count += 1
+        self.db_time += duration
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append((duration, sql))
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'img;dur={self.image_time * 1000:.1f}',
+            f'app;dur={total * 1000:.1f}',
+        ))
+
+    def as_dict(self, request, response, total):
+        match = request.resolver_match
+        return {
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'app_ms': round(total * 1000, 1),
+            'db_queries': self.db_count,
+            'db_ms': round(self.db_time * 1000, 1),
+            'tpl_ms': round(self.template_time * 1000, 1),
+            'img_ms': round(self.image_time * 1000, 1),
+        }
+
+
+def current():
+    return _current.get()
+
+
+def start():
+    return _current.set(RequestTimings())
+
+
+def stop(token):
+    timings = _current.get()
+    _current.reset(token)
+    return timings
+
+
+def finish(token, request, response, slow_ms):
+    timings = stop(token)
+    total = time.perf_counter() - timings.started
+    response['Server-Timing'] = timings.server_timing(total)
+
+    record = timings.as_dict(request, response, total)
+    perf_log.info(json.dumps(record, ensure_ascii=False))
+    if record['app_ms'] >= slow_ms:
+        record['queries'] = [
+            {'ms': round(duration * 1000, 2), 'sql': sql}
+            for duration, sql in sorted(timings.queries, key=lambda q: q[0], reverse=True)[:SLOW_SQL_LIMIT]
+        ]
+        slow_log.warning(json.dumps(record, ensure_ascii=False))
+    return response
+
+
+# ── SQL: execute_wrapper на каждом соединении (подключается в main/signals.py) ──
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(connection):
+    # connection_created приходит и при переподключении — не дублируем обёртку
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# ── КАРТИНКИ: время сборки URL/srcset (Cloudinary или локальные копии) в шаблонных тегах ──
+def timed_images(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.image_time += time.perf_counter() - started
+    return wrapper
+
+
+# ── ШАБЛОНЫ: бэкенд DjangoTemplates, который замеряет render() ──
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        # вложенные render_to_string считаются в составе внешнего шаблона
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
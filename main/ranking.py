@@ -0,0 +1,171 @@
+import hashlib
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import JobWatermark, OrderItem, Product
+
+
+# =====================
+# РЕЙТИНГ ТОВАРОВ (featured_score)
+# =====================
+# featured_score = смесь продаж за окно, остатка, глубины скидки, новизны
+# и ручной отметки is_featured; веса — settings.RANKING. Оценка товара зависит
+# только от его собственных данных, поэтому пересчёт бывает двух видов:
+#  - полный (--full, раз в сутки): все товары, заодно "стареют" новинки;
+#  - инкрементальный (каждые несколько минут): товары с продажами новее
+#    водяного знака (последний обработанный id OrderItem), товары, чьи продажи
+#    с прошлого прогона выпали из окна, и товары с изменёнными ценой, скидкой,
+#    остатком или is_featured — их находит отпечаток Product.ranking_digest,
+#    который пишется вместе с оценкой (правки из админки, импорт, новые товары).
+# Оценки считаются пачками по CHUNK_SIZE строк values_list, а записываются
+# одним UPDATE из временной таблицы, и только те, что реально изменились.
+WATERMARK = 'ranking:order_item'
+WINDOW_WATERMARK = 'ranking:window_start'  # начало окна продаж прошлого прогона, unix-время
+CHUNK_SIZE = 5000
+INSERT_BATCH = 400
+ID_CHUNK = 500  # больше товаров к пересчёту — продажи считаются по всему окну одним запросом
+EPSILON = 1e-4
+# позиции заказов моложе этого не берём: позиция с меньшим id может ещё не
+# закоммититься, а знак, ушедший дальше неё, её бы уже не увидел
+SETTLE_TIME = timedelta(minutes=1)
+
+PRODUCT_TABLE = Product._meta.db_table
+SCORES_TABLE = 'main_ranking_scores'
+
+
+class RankingResult:
+    def __init__(self, mode, scanned=0, changed=0):
+        self.mode = mode
+        self.scanned = scanned
+        self.changed = changed
+
+
+def _sales(since, product_ids=None):
+    items = OrderItem.objects.filter(order__created_at__gte=since, product__isnull=False)
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    return dict(
+        items.values('product_id').annotate(units=Sum('quantity')).values_list('product_id', 'units')
+    )
+
+
+def _digest(row):
+    """Отпечаток входов оценки, которые меняются без продаж."""
+    pk, price, discount_price, stock, created_at, is_featured, old, digest = row
+    return hashlib.sha1(repr((str(price), str(discount_price), stock, is_featured)).encode()).hexdigest()[:16]
+
+
+def _scores(rows, sales, now, weights):
+    """rows — (id, price, discount_price, stock, created_at, is_featured, featured_score, ranking_digest)."""
+    per_month = 30 / weights['window_days']
+    stock_cap = weights['stock_cap']
+    half_life = weights['recency_half_life']
+    for row in rows:
+        pk, price, discount_price, stock, created_at, is_featured, old, digest = row
+        depth = float((price - discount_price) / price) if discount_price and price and discount_price < price else 0.0
+        age_days = max((now - created_at).total_seconds(), 0) / 86400
+        score = (
+            weights['sales'] * math.log1p(sales.get(pk, 0) * per_month)
+            + weights['stock'] * min(stock, stock_cap) / stock_cap
+            + weights['discount'] * depth
+            + weights['recency'] * 0.5 ** (age_days / half_life)
+            + (weights['featured_boost'] if is_featured else 0.0)
+        )
+        score = round(score, 4)
+        new_digest = _digest(row)
+        if abs(score - old) > EPSILON or new_digest != digest:
+            yield pk, score, new_digest
+
+
+def _write_scores(scores):
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        Product.objects.bulk_update(
+            [Product(pk=pk, featured_score=score, ranking_digest=digest) for pk, score, digest in scores],
+            ['featured_score', 'ranking_digest'], batch_size=1000,
+        )
+        return
+    # UPDATE ... FROM по временной таблице: один проход вместо тысяч CASE WHEN у bulk_update
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE {SCORES_TABLE} (id bigint PRIMARY KEY, score double precision, digest varchar(16))")
+        try:
+            for start in range(0, len(scores), INSERT_BATCH):
+                batch = scores[start:start + INSERT_BATCH]
+                cursor.execute(
+                    f"INSERT INTO {SCORES_TABLE} (id, score, digest) VALUES " + ', '.join(['(%s, %s, %s)'] * len(batch)),
+                    [value for triple in batch for value in triple],
+                )
+            cursor.execute(
+                f"UPDATE {PRODUCT_TABLE} SET featured_score = s.score, ranking_digest = s.digest "
+                f"FROM {SCORES_TABLE} s WHERE {PRODUCT_TABLE}.id = s.id"
+            )
+        finally:
+            cursor.execute(f"DROP TABLE {SCORES_TABLE}")
+
+
+def _chunks(iterable):
+    chunk = []
+    for row in iterable:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def rank_products(full=False, dry_run=False):
+    weights = settings.RANKING
+    now = timezone.now()
+    since = now - timedelta(days=weights['window_days'])
+
+    # водяной знак фиксируем до чтения: заказы, пришедшие во время пересчёта, попадут в следующий
+    high = (
+        OrderItem.objects.filter(order__created_at__lte=now - SETTLE_TIME)
+        .aggregate(high=Max('id'))['high'] or 0
+    )
+    # знака нет — пересчёт ещё не запускался; знак 0 (заказов пока нет) — обычный инкрементальный
+    watermark = JobWatermark.objects.filter(name=WATERMARK).values_list('position', flat=True).first()
+    rows = Product.objects.order_by().values_list(
+        'id', 'price', 'discount_price', 'stock', 'created_at', 'is_featured', 'featured_score', 'ranking_digest'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    if full or watermark is None:
+        mode = 'full'
+        sales = _sales(since)
+    else:
+        mode = 'incremental'
+        items = OrderItem.objects.filter(product__isnull=False)
+        product_ids = set(items.filter(id__gt=watermark, id__lte=high).values_list('product_id', flat=True))
+        window_start = JobWatermark.read(WINDOW_WATERMARK)
+        if window_start:
+            previous_since = datetime.fromtimestamp(window_start, tz=dt_timezone.utc)
+            product_ids.update(
+                items.filter(order__created_at__gte=previous_since, order__created_at__lt=since)
+                .values_list('product_id', flat=True)
+            )
+        # все строки просматриваются, но оцениваются только выбранные и изменённые
+        rows = [row for row in rows if row[0] in product_ids or _digest(row) != row[-1]]
+        ids = [row[0] for row in rows]
+        sales = _sales(since, ids) if len(ids) <= ID_CHUNK else _sales(since)
+
+    result = RankingResult(mode)
+    changed = []
+    for chunk in _chunks(rows):
+        result.scanned += len(chunk)
+        changed.extend(_scores(chunk, sales, now, weights))
+    result.changed = len(changed)
+
+    if not dry_run:
+        with transaction.atomic():
+            if changed:
+                _write_scores(changed)
+                # bulk-запись не шлёт сигналов, а порядок каталога изменился
+                bump_catalog_version()
+            JobWatermark.advance(WATERMARK, high)
+            JobWatermark.advance(WINDOW_WATERMARK, int(since.timestamp()))
+    return result
@@ -0,0 +1,143 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+
+# =====================
+# ПОЛНОТЕКСТОВЫЙ ПОИСК ПО ТОВАРАМ
+# =====================
+# SQLite (локально): виртуальная таблица FTS5, rowid = id товара.
+# PostgreSQL (прод): таблица с tsvector и GIN-индексом.
+# Индекс обновляется сигналами Product (main/signals.py), пересобирается
+# командой rebuild_search_index. Ранжирование: релевантность, затем featured_score.
+SEARCH_FIELDS = ('title', 'brand', 'model_name', 'sku', 'cpu', 'gpu', 'description')
+
+PRODUCT_TABLE = 'main_product'
+FTS_TABLE = 'main_product_fts'
+PG_TABLE = 'main_product_search'
+
+# веса bm25 в порядке SEARCH_FIELDS
+FTS_WEIGHTS = (10.0, 6.0, 6.0, 8.0, 3.0, 3.0, 1.0)
+
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(model_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(brand, '') || ' ' || coalesce(sku, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(cpu, '') || ' ' || coalesce(gpu, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(query):
+    return TOKEN_RE.findall((query or '').lower())[:10]
+
+
+def create_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(SEARCH_FIELDS)}, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+                f"product_id bigint PRIMARY KEY REFERENCES {PRODUCT_TABLE}(id) ON DELETE CASCADE, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_gin ON {PG_TABLE} USING GIN (document)")
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+
+
+def _reindex(connection, where='', params=()):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            columns = ', '.join(SEARCH_FIELDS)
+            if where:
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM {PRODUCT_TABLE} {where})", params)
+            else:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM {PRODUCT_TABLE} {where}",
+                params,
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (product_id, document) "
+                f"SELECT id, {PG_DOCUMENT} FROM {PRODUCT_TABLE} {where} "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                params,
+            )
+
+
+def index_product(product_id, using='default'):
+    _reindex(connections[using], 'WHERE id = %s', [product_id])
+
+
+def unindex_product(product_id, using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+        # в PostgreSQL строку удаляет ON DELETE CASCADE
+
+
+def rebuild_search_index(using='default'):
+    connection = connections[using]
+    create_search_index(connection)
+    _reindex(connection)
+
+
+def search_product_ids(query, limit=96, using='default'):
+    """id доступных товаров в порядке релевантности (при равенстве — по featured_score)."""
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # каждое слово — префиксный запрос, все слова обязательны
+            match = ' '.join(f'"{token}"*' for token in tokens)
+            weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+            cursor.execute(
+                f"SELECT p.id FROM {FTS_TABLE} f JOIN {PRODUCT_TABLE} p ON p.id = f.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s AND p.is_available "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}), p.featured_score DESC LIMIT %s",
+                [match, limit],
+            )
+        elif connection.vendor == 'postgresql':
+            tsquery = ' & '.join(f'{token}:*' for token in tokens)
+            cursor.execute(
+                f"SELECT p.id FROM {PG_TABLE} s JOIN {PRODUCT_TABLE} p ON p.id = s.product_id, "
+                "to_tsquery('simple', %s) q "
+                "WHERE s.document @@ q AND p.is_available "
+                "ORDER BY ts_rank(s.document, q) DESC, p.featured_score DESC LIMIT %s",
+                [tsquery, limit],
+            )
+        else:
+            return _fallback_ids(tokens, limit)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(tokens, limit):
+    # для прочих СУБД — медленный icontains, чтобы поиск хотя бы работал
+    from .models import Product
+
+    queryset = Product.objects.filter(is_available=True)
+    for token in tokens:
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': token})
+        queryset = queryset.filter(condition)
+    return list(queryset.values_list('id', flat=True)[:limit])
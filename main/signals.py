@@ -0,0 +1,88 @@
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .facets import FACET_FIELDS, apply_facet_delta, facet_values
+from .caching import bump_catalog_version
+from .models import Order, OrderItem, Product, ProductImage
+from .perf import install_query_recorder
+from .search import index_product, unindex_product
+
+
+# =====================
+# ФАСЕТЫ: инкрементальное обновление счётчиков
+# =====================
+@receiver(pre_save, sender=Product)
+def remember_old_facets(sender, instance, raw=False, **kwargs):
+    old = None
+    if instance.pk and not raw:
+        old = Product.objects.filter(pk=instance.pk).only(
+            'is_available', 'price', 'discount_price', *FACET_FIELDS
+        ).first()
+    instance._old_facets = facet_values(old)
+
+
+@receiver(post_save, sender=Product)
+def update_facets_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    apply_facet_delta(getattr(instance, '_old_facets', set()), facet_values(instance))
+    instance._old_facets = facet_values(instance)
+
+
+@receiver(post_delete, sender=Product)
+def update_facets_on_delete(sender, instance, **kwargs):
+    apply_facet_delta(facet_values(instance), set())
+
+
+# =====================
+# ПОИСКОВЫЙ ИНДЕКС
+# =====================
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, raw=False, using='default', **kwargs):
+    if not raw:
+        index_product(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, using='default', **kwargs):
+    unindex_product(instance.pk, using=using)
+
+
+# =====================
+# ИТОГИ ЗАКАЗА (правки позиций в админке)
+# =====================
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_order_totals(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or instance.order_id is None:
+        return
+    # позиции удаляются каскадом вместе с заказом: строка заказа на этот момент
+    # ещё есть, но пересчитывать итоги удаляемого заказа незачем
+    if isinstance(origin, Order) or (isinstance(origin, QuerySet) and origin.model is Order):
+        return
+
+    order = Order.objects.filter(pk=instance.order_id).first()
+    if order is not None:
+        order.recalculate_totals()
+
+
+# =====================
+# КЕШ КАТАЛОГА (блок "Лучшие товары" и т.п.)
+# =====================
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_catalog_cache(sender, raw=False, **kwargs):
+    if not raw:
+        bump_catalog_version()
+
+
+# =====================
+# ЗАМЕР SQL ДЛЯ Server-Timing (main/perf.py)
+# =====================
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    install_query_recorder(connection)
@@ -0,0 +1,279 @@
+import hashlib
+import heapq
+import math
+import re
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .caching import bump_catalog_version
+from .models import Product, ProductVector, SimilarProduct
+
+
+# =====================
+# ПОХОЖИЕ ТОВАРЫ
+# =====================
+# Характеристики товара превращаются в вектор: память, накопитель, тип
+# накопителя, уровни процессора и видеокарты, состояние (шкалы 0..1, умноженные
+# на веса settings.SIMILARITY) и ln цены продажи. Похожие — k ближайших по
+# евклидову расстоянию среди доступных товаров; они лежат в SimilarProduct,
+# и страница товара читает их одним запросом по индексу (product, rank).
+#
+# Все координаты, кроме цены, принимают немного значений, поэтому товары
+# складываются в дерево по этим координатам, а в листе — список по цене.
+# Поиск соседей обходит дерево от ближних ветвей к дальним и отсекает ветви,
+# которые уже дальше k-го найденного; в листе идёт от своей цены в обе стороны.
+# Так точный top-k получается без перебора всего каталога и без numpy.
+#
+# Пересчёт инкрементальный: отпечаток вектора (ProductVector.digest) выдаёт
+# изменённые товары; пересчитываются они сами, товары, у которых они были
+# в соседях, и товары, к которым изменённый подошёл ближе их k-го соседа
+# (ProductVector.radius).
+DIMENSIONS = ('ram', 'storage', 'storage_type', 'cpu', 'gpu', 'condition')
+CONDITION_SCORES = {'new': 1.0, 'refurbished': 0.5, 'used': 0.0}
+FULL_REBUILD_SHARE = 0.3  # изменилось больше этой доли каталога — проще пересчитать всё
+WRITE_BATCH = 2000
+ID_CHUNK = 500  # id в одном IN (...), с запасом под лимит параметров SQLite
+
+SIMILAR_TABLE = SimilarProduct._meta.db_table
+VECTOR_TABLE = ProductVector._meta.db_table
+
+_INTEL = re.compile(r'\bi([3579])[- ]?(\d{1,2})\d{2,3}')
+_RYZEN = re.compile(r'ryzen\s*([3579])\s*(\d)\d{3}')
+_APPLE = re.compile(r'\bm([1-4])\b\s*(pro|max|ultra)?')
+_NVIDIA = re.compile(r'\b(rtx|gtx|mx)\s*(\d{2,4})')
+_RADEON_RX = re.compile(r'\brx\s*(\d{3,4})')
+
+
+class SimilarityResult:
+    def __init__(self, mode, products=0, changed=0, recomputed=0):
+        self.mode = mode
+        self.products = products
+        self.changed = changed
+        self.recomputed = recomputed
+
+
+def cpu_tier(cpu):
+    """Уровень процессора 0..1 по названию: семейство плюс поколение."""
+    name = (cpu or '').lower()
+    match = _INTEL.search(name)
+    if match:
+        family, generation = int(match.group(1)), int(match.group(2))
+        return min(1.0, 0.1 * family + 0.02 * min(generation, 14))
+    match = _RYZEN.search(name)
+    if match:
+        family, generation = int(match.group(1)), int(match.group(2))
+        return min(1.0, 0.1 * family + 0.03 * min(generation, 9))
+    match = _APPLE.search(name)
+    if match:
+        return min(1.0, 0.55 + 0.1 * int(match.group(1)) + (0.15 if match.group(2) else 0.0))
+    if any(word in name for word in ('celeron', 'pentium', 'atom', 'athlon', 'core 2', 'duo')):
+        return 0.1
+    return 0.4  # не распознали — середина шкалы, а не "самый слабый"
+
+
+def gpu_tier(gpu):
+    """Уровень видеокарты 0..1; пусто и встроенная графика — внизу шкалы."""
+    name = (gpu or '').lower()
+    match = _NVIDIA.search(name)
+    if match:
+        series, number = match.group(1), int(match.group(2))
+        model = number % 100 if number >= 1000 else number % 10 * 10
+        base = {'mx': 0.25, 'gtx': 0.45, 'rtx': 0.65}[series]
+        return min(1.0, base + model / 400)
+    match = _RADEON_RX.search(name)
+    if match:
+        return min(1.0, 0.45 + int(match.group(1)) % 1000 / 4000)
+    return 0.1 if name else 0.0
+
+
+def spec_vector(ram_gb, storage_gb, storage_type, cpu, gpu, condition, weights):
+    return (
+        weights['ram'] * math.log2(max(ram_gb, 1)) / 7,             # 128 ГБ → 1
+        weights['storage'] * math.log2(max(storage_gb, 1)) / 12,    # 4 ТБ → 1
+        weights['storage_type'] * (1.0 if storage_type == 'SSD' else 0.0),
+        weights['cpu'] * cpu_tier(cpu),
+        weights['gpu'] * gpu_tier(gpu),
+        weights['condition'] * CONDITION_SCORES.get(condition, 0.0),
+    )
+
+
+def load_vectors(weights):
+    """{id: (координаты-ключ, цена, доступен)} для всех товаров одним проходом."""
+    vectors = {}
+    rows = Product.objects.order_by().values_list(
+        'id', 'ram_gb', 'storage_gb', 'storage_type', 'cpu', 'gpu', 'condition',
+        'price', 'discount_price', 'is_available',
+    )
+    for pk, ram, storage, storage_type, cpu, gpu, condition, price, discount, available in rows.iterator(chunk_size=5000):
+        effective = discount or price
+        key = tuple(round(value, 4) for value in spec_vector(ram, storage, storage_type, cpu, gpu, condition, weights))
+        vectors[pk] = (key, weights['price'] * math.log(max(float(effective), 1.0)), available)
+    return vectors
+
+
+def _digest(vector):
+    key, price, available = vector
+    return hashlib.sha1(repr((key, round(price, 6), available)).encode()).hexdigest()[:16]
+
+
+class SpecIndex:
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.tree = {}
+        for pk, (key, price, available) in vectors.items():
+            node = self.tree
+            for value in key[:-1]:
+                node = node.setdefault(value, {})
+            node.setdefault(key[-1], []).append((price, pk, available))
+        self._sort_leaves(self.tree, 0)
+
+    def _sort_leaves(self, node, depth):
+        for value, child in node.items():
+            if depth == len(DIMENSIONS) - 1:
+                child.sort()
+                node[value] = ([price for price, _, _ in child], child)
+            else:
+                self._sort_leaves(child, depth + 1)
+
+    def _leaves(self, key, node, depth, partial, bound):
+        # ветви от ближних к дальним; как только ветвь дальше границы — дальше только хуже
+        target = key[depth]
+        for value, child in sorted(node.items(), key=lambda item: abs(item[0] - target)):
+            distance = partial + (value - target) ** 2
+            if distance >= bound():
+                break
+            if depth == len(DIMENSIONS) - 1:
+                yield distance, child
+            else:
+                yield from self._leaves(key, child, depth + 1, distance, bound)
+
+    def _scan(self, leaf, price, partial, bound):
+        # от своей цены вверх и вниз, пока разница цен не выводит за границу
+        prices, entries = leaf
+        start = bisect_left(prices, price)
+        for step, stop in ((1, len(entries)), (-1, -1)):
+            index = start if step == 1 else start - 1
+            while index != stop:
+                other_price, pk, available = entries[index]
+                distance = partial + (other_price - price) ** 2
+                if distance >= bound():
+                    break
+                yield distance, pk, available
+                index += step
+
+    def nearest(self, pk, k):
+        """[(квадрат расстояния, id)] k ближайших доступных товаров, ближние первыми."""
+        key, price, _ = self.vectors[pk]
+        heap = []  # (-расстояние, -id): вершина — самый дальний из найденных
+
+        def bound():
+            return -heap[0][0] if len(heap) >= k else math.inf
+
+        for partial, leaf in self._leaves(key, self.tree, 0, 0.0, bound):
+            for distance, other, available in self._scan(leaf, price, partial, bound):
+                if other == pk or not available:
+                    continue
+                if len(heap) < k:
+                    heapq.heappush(heap, (-distance, -other))
+                else:
+                    heapq.heappushpop(heap, (-distance, -other))
+        return sorted((-distance, -other) for distance, other in heap)
+
+    def within(self, pk, radius2):
+        """Все товары (и недоступные) ближе sqrt(radius2) к товару pk."""
+        key, price, _ = self.vectors[pk]
+
+        def bound():
+            return radius2
+
+        for partial, leaf in self._leaves(key, self.tree, 0, 0.0, bound):
+            for distance, other, _ in self._scan(leaf, price, partial, bound):
+                if other != pk:
+                    yield distance, other
+
+
+def _chunked(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_CHUNK):
+        yield ids[start:start + ID_CHUNK]
+
+
+def _affected(index, changed, k):
+    affected = set(changed)
+    # в чьих списках были изменённые или удалённые (ссылка обнулилась) товары
+    affected.update(SimilarProduct.objects.filter(similar__isnull=True).values_list('product_id', flat=True))
+    for chunk in _chunked(changed):
+        affected.update(SimilarProduct.objects.filter(similar_id__in=chunk).values_list('product_id', flat=True))
+
+    # к кому изменённый товар теперь ближе, чем их k-й сосед
+    radii = dict(ProductVector.objects.values_list('product_id', 'radius'))
+    unbounded = {pk for pk, radius in radii.items() if radius is None}
+    reach = max((radius for radius in radii.values() if radius is not None), default=0.0) ** 2
+    for pk in changed:
+        if not index.vectors[pk][2]:
+            continue  # стал недоступен: его уже нашли по обратной ссылке выше
+        affected.update(unbounded)
+        for distance, other in index.within(pk, reach):
+            radius = radii.get(other)
+            if radius is None or distance < radius ** 2:
+                affected.add(other)
+    return affected
+
+
+def _write(neighbours, digests, full, k):
+    # сотни тысяч строк: executemany без создания объектов моделей (bulk_create тут в разы медленнее)
+    similar_rows = [
+        (pk, other, rank, round(math.sqrt(distance), 6))
+        for pk, found in neighbours.items()
+        for rank, (distance, other) in enumerate(found, start=1)
+    ]
+    vector_rows = [
+        (pk, digests[pk], math.sqrt(found[-1][0]) if len(found) >= k else None)
+        for pk, found in neighbours.items()
+    ]
+    with transaction.atomic():
+        if full:
+            SimilarProduct.objects.all().delete()
+            ProductVector.objects.all().delete()
+        else:
+            for chunk in _chunked(neighbours):
+                SimilarProduct.objects.filter(product_id__in=chunk).delete()
+                ProductVector.objects.filter(product_id__in=chunk).delete()
+        with connection.cursor() as cursor:
+            for start in range(0, len(similar_rows), WRITE_BATCH):
+                cursor.executemany(
+                    f"INSERT INTO {SIMILAR_TABLE} (product_id, similar_id, rank, distance) VALUES (%s, %s, %s, %s)",
+                    similar_rows[start:start + WRITE_BATCH],
+                )
+            for start in range(0, len(vector_rows), WRITE_BATCH):
+                cursor.executemany(
+                    f"INSERT INTO {VECTOR_TABLE} (product_id, digest, radius) VALUES (%s, %s, %s)",
+                    vector_rows[start:start + WRITE_BATCH],
+                )
+        # страница товара кешируется по версии каталога
+        bump_catalog_version()
+
+
+def rebuild_similar_products(full=False, dry_run=False):
+    weights = settings.SIMILARITY
+    k = weights['neighbours']
+    vectors = load_vectors(weights)
+    digests = {pk: _digest(vector) for pk, vector in vectors.items()}
+    stored = dict(ProductVector.objects.values_list('product_id', 'digest'))
+    changed = {pk for pk, digest in digests.items() if stored.get(pk) != digest}
+    index = SpecIndex(vectors)
+
+    if full or not stored or len(changed) > FULL_REBUILD_SHARE * len(vectors):
+        mode, full, affected = 'full', True, set(vectors)
+    else:
+        mode = 'incremental'
+        affected = _affected(index, changed, k) & set(vectors)
+
+    result = SimilarityResult(mode, len(vectors), len(changed), len(affected))
+    if dry_run or not affected:
+        return result
+    neighbours = {pk: index.nearest(pk, k) for pk in affected}
+    _write(neighbours, digests, full, k)
+    return result
@@ -0,0 +1,41 @@
+// +, - и удаление без перезагрузки: форма уходит через fetch, сервер отвечает JSON
+// с новой строкой и итогами (без JS формы работают как обычно — редиректом)
+(function () {
+    const items = document.querySelector('.cart-items');
+    if (!items || !window.fetch) return;
+
+    items.addEventListener('submit', function (event) {
+        const form = event.target;
+        event.preventDefault();
+        fetch(form.action, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        })
+            .then(function (response) {
+                // строку уже удалили в другой вкладке и т.п. — показываем корзину как есть
+                if (!response.ok) throw new Error(response.status);
+                return response.json();
+            })
+            .then(function (data) {
+                if (!data.count) {
+                    // корзина опустела — нужна страница "кошик порожній"
+                    window.location.reload();
+                    return;
+                }
+                const line = form.closest('.cart-item');
+                if (data.quantity) {
+                    document.getElementById('qty-' + data.item).textContent = data.quantity;
+                    line.querySelector('.total').textContent = data.line_total + ' ₴';
+                } else {
+                    line.remove();
+                }
+                document.getElementById('cartTotal').textContent = data.cart_total + ' ₴';
+                const counter = document.querySelector('.cart-count');
+                if (counter) counter.textContent = data.count;
+            })
+            .catch(function () {
+                window.location.reload();
+            });
+    });
+})();
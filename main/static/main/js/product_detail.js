@@ -0,0 +1,32 @@
+const mainImage = document.getElementById("mainImage");
+// Миниатюры хранят ссылки на большие версии в data-full / data-srcset
+const images = Array.from(document.getElementById("thumbs").getElementsByTagName("img"));
+
+let currentIndex = 0;
+
+function changeImage(thumb) {
+    if (!mainImage) return;
+    mainImage.style.opacity = 0;
+    setTimeout(() => {
+        // без Cloudinary главное фото обёрнуто в <picture>: AVIF-источник перекрыл бы новый srcset
+        if (mainImage.parentElement.tagName === 'PICTURE') {
+            mainImage.parentElement.querySelectorAll('source').forEach(source => source.remove());
+        }
+        mainImage.srcset = thumb.dataset.srcset;
+        mainImage.src = thumb.dataset.full;
+        mainImage.style.opacity = 1;
+        currentIndex = images.indexOf(thumb);
+    }, 150);
+}
+
+function prevImage() {
+    if (!images.length) return;
+    currentIndex = (currentIndex - 1 + images.length) % images.length;
+    changeImage(images[currentIndex]);
+}
+
+function nextImage() {
+    if (!images.length) return;
+    currentIndex = (currentIndex + 1) % images.length;
+    changeImage(images[currentIndex]);
+}
@@ -0,0 +1,25 @@
+// Догружаем следующую страницу карточек без перезагрузки (без JS работает обычная ссылка)
+(function () {
+    const button = document.getElementById('loadMore');
+    const grid = document.getElementById('productsGrid');
+    if (!button || !window.fetch) return;
+
+    button.addEventListener('click', function (event) {
+        event.preventDefault();
+        const url = button.dataset.url + 'after=' + encodeURIComponent(button.dataset.cursor);
+        fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(function (response) {
+                const next = response.headers.get('X-Next-Cursor');
+                return response.text().then(function (html) { return [html, next]; });
+            })
+            .then(function ([html, next]) {
+                grid.insertAdjacentHTML('beforeend', html);
+                if (next) {
+                    button.dataset.cursor = next;
+                    button.href = button.href.replace(/after=[^&]*/, 'after=' + next);
+                } else {
+                    button.parentNode.remove();
+                }
+            });
+    });
+})();
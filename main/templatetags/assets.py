@@ -0,0 +1,45 @@
+import re
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+# =====================
+# CSS / JS ИЗ STATIC
+# =====================
+# Стили и скрипты страниц лежат в main/static/main/ и после collectstatic
+# получают хеш в имени (CompressedManifestStaticFilesStorage): WhiteNoise отдаёт
+# их сжатыми и с кешем на год, а в HTML остаётся только критичный CSS.
+@register.simple_tag
+def stylesheet(path):
+    """{% stylesheet 'main/css/products.css' %} — загрузка без блокировки отрисовки."""
+    url = static(path)
+    return format_html(
+        '<link rel="stylesheet" href="{}" media="print" onload="this.media=\'all\'">'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        url, url,
+    )
+
+
+@lru_cache(maxsize=None)
+def _minified(path):
+    filename = finders.find(path)
+    if filename is None:
+        raise template.TemplateSyntaxError(f'inline_static: {path} не найден в static')
+    with open(filename, encoding='utf-8') as fh:
+        css = fh.read()
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{}:;,])\s*', r'\1', css).strip()
+
+
+@register.simple_tag
+def inline_static(path):
+    """{% inline_static 'main/css/critical.css' %} — содержимое CSS-файла без комментариев и пробелов."""
+    return mark_safe(_minified(path))
@@ -0,0 +1,62 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+from main.perf import timed_images
+from main.images import CARD_WIDTHS, CART_WIDTHS, DETAIL_WIDTHS, THUMB_WIDTHS, image_placeholder, image_srcset, image_url
+
+register = template.Library()
+
+# пресет: (ширины для srcset, sizes, ширина для src по умолчанию)
+PRESETS = {
+    'card': (CARD_WIDTHS, '(max-width: 480px) 45vw, (max-width: 768px) 30vw, 240px', 300),
+    'thumb': (THUMB_WIDTHS, '80px', 80),
+    'cart': (CART_WIDTHS, '120px', 120),
+    'detail': (DETAIL_WIDTHS, '(max-width: 768px) 100vw, 50vw', 800),
+}
+
+
+@register.simple_tag(name='image_url')
+@timed_images
+def image_url_tag(image, width=None):
+    return image_url(image, width)
+
+
+@register.simple_tag(name='image_srcset')
+@timed_images
+def image_srcset_tag(image, preset='detail'):
+    return image_srcset(image, PRESETS[preset][0])
+
+
+@register.simple_tag
+@timed_images
+def responsive_image(image, preset='card', **attrs):
+    """{% responsive_image product.image 'card' alt=product.title class='product-image' %}"""
+    if not image:
+        return ''
+    widths, sizes, default_width = PRESETS[preset]
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    placeholder = image_placeholder(image)
+    if placeholder:
+        # размытая заглушка видна, пока грузится сама картинка
+        attrs['style'] = f"background:url('{placeholder}') center/cover no-repeat;{attrs.get('style', '')}"
+    extra = format_html_join(
+        ' ', '{}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items())
+    )
+    img = format_html(
+        '<img src="{}" srcset="{}" sizes="{}" {}>',
+        image_url(image, default_width),
+        image_srcset(image, widths),
+        sizes,
+        extra,
+    )
+    if settings.LOCAL_IMAGES:
+        # у Cloudinary формат выбирает f_auto, локально AVIF предлагаем через <picture>
+        avif_srcset = image_srcset(image, widths, fmt='avif')
+        if avif_srcset:
+            return format_html(
+                '<picture><source type="image/avif" srcset="{}" sizes="{}">{}</picture>',
+                avif_srcset, sizes, img,
+            )
+    return img
@@ -0,0 +1,39 @@
+from django.test import TransactionTestCase
+
+from main import copurchase, ranking
+from main.benchmark import clear_benchmark_data, generate_benchmark_data
+from main.copurchase import update_bought_together
+from main.models import JobWatermark, Order, OrderItem, Product, ProductPair, ProductVector, SimilarProduct
+from main.similarity import rebuild_similar_products
+
+
+class ClearBenchmarkDataTests(TransactionTestCase):
+    def setUp(self):
+        self.real = Product.objects.create(title='Real laptop', price=1000, ram_gb=16, storage_gb=512, stock=3)
+        generate_benchmark_data(products=40, images_per_product=1, cart_items=100, orders_per_day=1)
+
+    def test_clear_after_similar_products(self):
+        # тестовые товары в соседях у настоящего и у себя; удаление не должно упасть на FK
+        rebuild_similar_products(full=True)
+        self.assertTrue(SimilarProduct.objects.filter(product=self.real).exists())
+        clear_benchmark_data()
+        self.assertEqual(list(Product.objects.values_list('id', flat=True)), [self.real.id])
+        self.assertEqual(list(ProductVector.objects.values_list('product_id', flat=True)), [self.real.id])
+        self.assertEqual(set(SimilarProduct.objects.values_list('product_id', 'similar_id')), {(self.real.id, None)})
+
+    def test_clear_after_bought_together(self):
+        real_order = Order.objects.create(full_name='Customer', phone='1')
+        bench = Product.objects.filter(sku__startswith='BENCH-').first()
+        OrderItem.objects.create(order=real_order, product=self.real, quantity=1, price=1000)
+        OrderItem.objects.create(order=real_order, product=bench, quantity=1, price=1000)
+        Order.objects.filter(pk=real_order.pk).update(created_at=real_order.created_at - copurchase.SETTLE_TIME * 2)
+        update_bought_together()
+        self.assertTrue(ProductPair.objects.filter(product=self.real).exists())
+
+        clear_benchmark_data()
+        self.assertFalse(ProductPair.objects.exists())
+        self.assertEqual(JobWatermark.read(copurchase.WATERMARK), 0)
+        self.assertFalse(JobWatermark.objects.filter(name=ranking.WATERMARK).exists())
+        # пересчёт с нуля: в оставшемся заказе тестовый товар стал пустой ссылкой, пар нет
+        self.assertEqual(update_bought_together().mode, 'full')
+        self.assertFalse(ProductPair.objects.exists())
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.caching import CATALOG_VERSION_KEY, bump_catalog_version, catalog_version
+from main.models import JobWatermark, Product
+
+
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_is_read_from_database(self):
+        JobWatermark.advance(CATALOG_VERSION_KEY, 42)
+        self.assertEqual(catalog_version(), 42)
+
+    def test_bump_from_another_process_is_seen_after_cache_expiry(self):
+        before = catalog_version()
+        # другой процесс (cron-команда) пишет только в БД, локальный кеш об этом не знает
+        with self.captureOnCommitCallbacks(execute=False):
+            bump_catalog_version()
+        self.assertEqual(catalog_version(), before)
+        cache.delete(CATALOG_VERSION_KEY)  # истёк CATALOG_VERSION_TTL
+        self.assertNotEqual(catalog_version(), before)
+        self.assertEqual(catalog_version(), JobWatermark.read(CATALOG_VERSION_KEY))
+
+    def test_bump_updates_local_cache_on_commit(self):
+        before = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_catalog_version()
+        self.assertNotEqual(cache.get(CATALOG_VERSION_KEY), before)
+
+
+# без collectstatic манифеста нет: шаблоны берут статику как есть
+@override_settings(
+    PAGE_CACHE_ENABLED=True,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Product.objects.create(title='Laptop', price=1000, stock=5)
+
+    def _cache_status(self, url=None):
+        return self.client.get(url or reverse('about')).get('X-Page-Cache')
+
+    def test_anonymous_page_is_cached(self):
+        for url in (reverse('about'), reverse('products')):
+            self.assertEqual(self._cache_status(url), 'miss')
+            self.assertEqual(self._cache_status(url), 'hit')
+
+    def test_key_varies_by_cart_count(self):
+        self._cache_status()
+        self.client.cookies['cart_count'] = '2'
+        self.assertEqual(self._cache_status(), 'miss')
+        self.assertEqual(self._cache_status(), 'hit')
+        self.client.cookies['cart_count'] = '0'
+        self.assertEqual(self._cache_status(), 'hit')
+
+    def test_catalog_change_invalidates(self):
+        self._cache_status()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_catalog_version()
+        self.assertEqual(self._cache_status(), 'miss')
+
+    def test_session_without_cart_count_bypasses_cache(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'x' * 32
+        self.assertIsNone(self._cache_status())
+        self.assertIsNone(self._cache_status())
+
+    def test_authenticated_user_bypasses_cache(self):
+        self._cache_status()
+        self.client.force_login(User.objects.create_user('user', password='pass'))
+        self.client.cookies['cart_count'] = '0'
+        self.assertIsNone(self._cache_status())
+        self.assertIsNone(self._cache_status(reverse('products')))
@@ -0,0 +1,83 @@
+import threading
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from main.cart import DatabaseCart
+from main.models import CartItem, Product
+
+
+@override_settings(CART_BACKEND='cookie')
+class CookieCartTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(title='Laptop', price=1000, stock=2)
+
+    def _quantity(self):
+        return self.client.cookies['cart_count'].value
+
+    def test_increase_is_capped_by_stock(self):
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        for _ in range(3):
+            self.client.post(reverse('update_quantity', args=[self.product.id, 'increase']))
+        self.assertEqual(self._quantity(), '2')
+
+    def test_increase_after_stock_drop(self):
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        Product.objects.filter(pk=self.product.pk).update(stock=1)
+        self.client.post(reverse('update_quantity', args=[self.product.id, 'increase']))
+        self.assertEqual(self._quantity(), '1')
+
+
+class DatabaseCartConcurrencyTests(TransactionTestCase):
+    def test_concurrent_adds_stop_at_stock(self):
+        # двойной клик и несколько вкладок: количество и остаток проверяет БД,
+        # а не Python — у каждого запроса здесь устаревший экземпляр товара
+        product = Product.objects.create(title='Laptop', price=1000, stock=99)
+        Product.objects.filter(pk=product.pk).update(stock=7)
+        session = SessionStore()
+        session.create()
+        start = threading.Barrier(4)
+
+        def add():
+            request = RequestFactory().post('/')
+            request.session = SessionStore(session.session_key)
+            start.wait()
+            try:
+                for _ in range(5):
+                    DatabaseCart(request).add(product)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            list(CartItem.objects.filter(session_key=session.session_key).values_list('quantity', flat=True)), [7]
+        )
+
+
+@override_settings(CART_BACKEND='db')
+class CartResponseTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(title='Laptop', price=1000, discount_price=900, stock=5)
+
+    def test_form_post_redirects_to_cart(self):
+        response = self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+
+    def test_fetch_gets_json_with_line_and_totals(self):
+        headers = {'X-Requested-With': 'XMLHttpRequest'}
+        self.client.post(reverse('add_to_cart', args=[self.product.id]), headers=headers)
+        item = CartItem.objects.get()
+        response = self.client.post(reverse('update_quantity', args=[item.id, 'increase']), headers=headers)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual((data['item'], data['quantity'], data['count']), (item.id, 2, 2))
+        self.assertEqual(self.client.cookies['cart_count'].value, '2')
+
+        response = self.client.post(reverse('remove_from_cart', args=[item.id]), headers=headers)
+        self.assertEqual((response.json()['quantity'], response.json()['count']), (0, 0))
@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from main.caching import CATALOG_VERSION_KEY
+from main.checkout import OutOfStock, place_order
+from main.models import Job, JobWatermark, Order, Product
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.laptop = Product.objects.create(title='Laptop', price=1000, stock=3)
+        self.mouse = Product.objects.create(title='Mouse', price=100, discount_price=80, stock=10)
+
+    def test_reserves_stock_and_snapshots_price(self):
+        order = place_order('Test', '1', [(self.laptop, 2), (self.mouse, 1), (self.mouse, 1)])
+        self.laptop.refresh_from_db()
+        self.mouse.refresh_from_db()
+        self.assertEqual((self.laptop.stock, self.mouse.stock), (1, 8))
+        self.assertEqual(order.total, 2 * 1000 + 2 * 80)
+        self.assertEqual(sorted(order.items.values_list('price', 'quantity')), [(80, 2), (1000, 2)])
+
+    def test_oversell_rolls_back_everything(self):
+        with self.assertRaises(OutOfStock):
+            place_order('Test', '1', [(self.mouse, 1), (self.laptop, 4)])
+        self.laptop.refresh_from_db()
+        self.mouse.refresh_from_db()
+        self.assertEqual((self.laptop.stock, self.mouse.stock), (3, 10))
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_stale_product_instance_cannot_oversell(self):
+        # две вкладки прочитали один и тот же остаток; условие stock >= N проверяет БД
+        stale = Product.objects.get(pk=self.laptop.pk)
+        place_order('First', '1', [(self.laptop, 3)])
+        with self.assertRaises(OutOfStock):
+            place_order('Second', '2', [(stale, 1)])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_catalog_version_bumped_only_when_sold_out(self):
+        version = JobWatermark.read(CATALOG_VERSION_KEY)
+        place_order('Test', '1', [(self.laptop, 1)])
+        self.assertEqual(JobWatermark.read(CATALOG_VERSION_KEY), version)
+        place_order('Test', '1', [(self.laptop, 2)])
+        self.assertNotEqual(JobWatermark.read(CATALOG_VERSION_KEY), version)
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from main.facets import filter_products, parse_filters
+from main.models import Product
+
+
+class PriceFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cheap = Product.objects.create(title='Cheap', price=9000)
+        cls.discounted = Product.objects.create(title='Discounted', price=25000, discount_price=15000)
+        cls.regular = Product.objects.create(title='Regular', price=15000)
+        cls.expensive = Product.objects.create(title='Expensive', price=45000)
+
+    def _ids(self, *args):
+        return set(filter_products(Product.objects.filter(is_available=True), *args).values_list('id', flat=True))
+
+    def test_effective_price_prefers_discount(self):
+        self.assertEqual(Product.objects.get(pk=self.discounted.pk).effective_price, Decimal('15000'))
+        self.assertEqual(Product.objects.get(pk=self.regular.pk).effective_price, Decimal('15000'))
+
+    def test_bucket_uses_discount_price(self):
+        self.assertEqual(self._ids({'price': ['10000-20000']}), {self.discounted.id, self.regular.id})
+        self.assertEqual(self._ids({'price': ['0-10000', '40000-']}), {self.cheap.id, self.expensive.id})
+
+    def test_min_max_bounds_are_inclusive(self):
+        self.assertEqual(self._ids({}, Decimal('15000'), Decimal('15000')), {self.discounted.id, self.regular.id})
+
+    def test_filter_reads_indexed_column(self):
+        sql = str(filter_products(Product.objects.all(), {}, Decimal('1'), None).query)
+        self.assertIn('"main_product"."effective_price" >=', sql)
+        self.assertNotIn('COALESCE', sql)
+
+
+class ParseFiltersTests(TestCase):
+    def test_non_finite_and_oversized_prices_are_dropped(self):
+        for value in ('nan', 'NaN', 'inf', '-Infinity', '1e20', '100000000'):
+            _, price_min, price_max = parse_filters(QueryDict(f'price_min={value}&price_max={value}'))
+            self.assertEqual((price_min, price_max), (None, None), value)
+        _, price_min, _ = parse_filters(QueryDict('price_min=99999999.99'))
+        self.assertEqual(price_min, Decimal('99999999.99'))
+
+    def test_int_facets_are_bounded(self):
+        selected, _, _ = parse_filters(QueryDict('ram_gb=99999999999999999999999&ram_gb=016&storage_gb=abc'))
+        self.assertEqual(selected, {'ram_gb': ['16']})
+
+    def test_catalog_ignores_bad_values(self):
+        Product.objects.create(title='Laptop', price=1000, ram_gb=16)
+        for query in ('price_min=nan', 'price_max=inf', 'ram_gb=99999999999999999999999'):
+            response = self.client.get(reverse('products_more') + '?' + query)
+            self.assertEqual(response.status_code, 200, query)
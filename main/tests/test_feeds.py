@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+from django.test import AsyncClient, TestCase, override_settings
+
+from main.caching import catalog_version
+from main.feeds import feed_path, stream_feed
+from main.models import Product
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings_override = override_settings(FEED_ROOT=self.root.name, ALLOWED_HOSTS=['testserver'])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        Product.objects.create(title='Laptop <Pro>', price=1000, stock=2, sku='SKU-1')
+
+    async def _get(self, client, fmt='xml'):
+        response = await client.get(f'/feed.{fmt}')
+        self.assertTrue(response.is_async)
+        return response, b''.join([chunk async for chunk in response.streaming_content])
+
+    async def test_asgi_streams_then_serves_saved_file(self):
+        client = AsyncClient()
+        first, body = await self._get(client)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(b'<g:title>Laptop &lt;Pro&gt;</g:title>', body)
+
+        second, saved = await self._get(client)
+        self.assertEqual(saved, body)
+        self.assertEqual(int(second['Content-Length']), len(body))
+
+    def test_only_older_versions_are_removed(self):
+        version = catalog_version()
+        os.makedirs(self.root.name, exist_ok=True)
+        older, newer = feed_path('csv', version - 1), feed_path('csv', version + 1)
+        for path in (older, newer):
+            with open(path, 'wb') as fh:
+                fh.write(b'old')
+
+        list(stream_feed('csv', version))
+
+        self.assertFalse(os.path.exists(older))
+        self.assertTrue(os.path.exists(newer))
+        self.assertTrue(os.path.exists(feed_path('csv', version)))
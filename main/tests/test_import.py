@@ -0,0 +1,62 @@
+import io
+import zipfile
+
+from django.test import TestCase
+
+from main.catalog_import import CatalogImportError, import_catalog
+from main.models import Product
+
+
+def xlsx(rows_xml):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('xl/worksheets/sheet1.xml', (
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetData>{rows_xml}</sheetData></worksheet>'
+        ))
+    buffer.seek(0)
+    return buffer
+
+
+def inline(text):
+    return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+class CatalogImportTests(TestCase):
+    def test_cp1251_csv(self):
+        data = 'sku;title;price\nA-1;Ноутбук Lenovo;12999,00\n'.encode('cp1251')
+        report = import_catalog(io.BytesIO(data), 'prices.csv')
+        self.assertEqual((report.created, report.errors), (1, []))
+        self.assertEqual(Product.objects.get(sku='A-1').title, 'Ноутбук Lenovo')
+
+    def test_utf8_csv_with_bom(self):
+        data = '﻿sku,title,price\nA-1,Ноутбук,100\n'.encode('utf-8')
+        report = import_catalog(io.BytesIO(data), 'prices.csv')
+        self.assertEqual(report.created, 1)
+        self.assertEqual(Product.objects.get(sku='A-1').title, 'Ноутбук')
+
+    def test_unreadable_file_writes_nothing(self):
+        # первые пачки читаются нормально, байт 0x98 не существует в cp1251
+        lines = [f'A-{i};Товар {i};100' for i in range(10)]
+        data = ('sku;title;price\n' + '\n'.join(lines) + '\n').encode('cp1251') + b'A-10;\x98;100\n'
+        with self.assertRaisesMessage(CatalogImportError, 'кодировке'):
+            import_catalog(io.BytesIO(data), 'prices.csv', batch_size=2)
+        self.assertFalse(Product.objects.exists())
+
+    def test_row_errors_are_reported(self):
+        data = 'sku,title,price\nA-1,Ноутбук,abc\n,Без sku,100\nA-2,Мышь,100\n'.encode('utf-8')
+        report = import_catalog(io.BytesIO(data), 'prices.csv')
+        self.assertEqual(report.created, 1)
+        self.assertEqual([number for number, _, _ in report.errors], [2, 3])
+
+    def test_xlsx_cells_without_reference(self):
+        rows = (
+            f'<row>{inline("sku")}{inline("title")}{inline("price")}</row>'
+            f'<row>{inline("A-1")}<c r="C2"><v>100</v></c></row>'
+            f'<row>{inline("A-2")}{inline("Мышь")}<c><v>50</v></c></row>'
+        )
+        report = import_catalog(xlsx(rows), 'prices.xlsx')
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.errors, [(2, 'A-1', 'новый товар: нет title')])
+        mouse = Product.objects.get(sku='A-2')
+        self.assertEqual((mouse.title, mouse.price), ('Мышь', 50))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.admin import helpers
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main import jobs
+from main.models import Job
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def flaky(fail=False):
+            self.calls.append(fail)
+            if fail:
+                raise RuntimeError('CRM недоступна')
+
+        jobs.task('test_flaky')(flaky)
+        self.addCleanup(jobs.TASKS.pop, 'test_flaky')
+
+    def test_enqueue_rolls_back_with_caller(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                jobs.enqueue('test_flaky')
+                raise RuntimeError
+        self.assertFalse(Job.objects.exists())
+
+    def test_enqueue_unknown_task(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('no_such_task')
+
+    def test_done(self):
+        job = jobs.enqueue('test_flaky')
+        result = jobs.work()
+        job.refresh_from_db()
+        self.assertEqual((result.claimed, result.done), (1, 1))
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+        self.assertEqual(jobs.work().claimed, 0)
+
+    def test_error_is_retried_with_backoff(self):
+        job = jobs.enqueue('test_flaky', {'fail': True})
+        before = timezone.now()
+        with self.assertLogs('main.jobs', 'WARNING'):
+            self.assertEqual(jobs.work().retried, 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('CRM недоступна', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + jobs.BACKOFF_BASE)
+        # пауза ещё не прошла — воркер задачу не берёт
+        self.assertEqual(jobs.work().claimed, 0)
+
+    def test_fails_after_max_attempts(self):
+        job = jobs.enqueue('test_flaky', {'fail': True})
+        Job.objects.filter(id=job.id).update(attempts=jobs.MAX_ATTEMPTS - 1)
+        with self.assertLogs('main.jobs', 'ERROR'):
+            self.assertEqual(jobs.work().failed, 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, jobs.MAX_ATTEMPTS))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_expired_lease_after_max_attempts_is_not_reclaimed(self):
+        # воркер взял последнюю попытку и умер: аренда истекла, run_job так и не ответил
+        job = jobs.enqueue('test_flaky')
+        Job.objects.filter(id=job.id).update(
+            attempts=jobs.MAX_ATTEMPTS, run_at=timezone.now() - timedelta(seconds=1)
+        )
+        with self.assertLogs('main.jobs', 'ERROR'):
+            self.assertEqual(jobs.work().claimed, 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('Аренда истекла', job.last_error)
+        self.assertEqual(self.calls, [])
+
+    def test_admin_retry(self):
+        failed = jobs.enqueue('test_flaky')
+        done = jobs.enqueue('test_flaky')
+        Job.objects.filter(id=failed.id).update(status=Job.FAILED, attempts=jobs.MAX_ATTEMPTS, finished_at=timezone.now())
+        Job.objects.filter(id=done.id).update(status=Job.DONE, attempts=1, finished_at=timezone.now())
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        self.client.post(reverse('admin:main_job_changelist'), {
+            'action': 'retry',
+            helpers.ACTION_CHECKBOX_NAME: [failed.id, done.id],
+        })
+        failed.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual((failed.status, failed.attempts, failed.finished_at), (Job.PENDING, 0, None))
+        self.assertEqual(done.status, Job.DONE)
+        self.assertEqual(jobs.work().done, 1)
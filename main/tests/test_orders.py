@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from main.models import Order, OrderItem, Product
+
+
+class OrderTotalsTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(title='Laptop', price=1000, stock=5)
+        self.order = Order.objects.create(full_name='Test', phone='1')
+        self.first = OrderItem.objects.create(order=self.order, product=product, quantity=2, price=1000)
+        self.second = OrderItem.objects.create(order=self.order, product=product, quantity=1, price=500)
+
+    def test_item_delete_recalculates_totals(self):
+        self.second.delete()
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.total, self.order.item_count), (Decimal('2000'), 2))
+
+    def _assert_no_totals_update(self, delete):
+        with CaptureQueriesContext(connection) as queries:
+            delete()
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "main_order"')])
+        self.assertFalse(OrderItem.objects.filter(order_id=self.order.pk).exists())
+
+    def test_order_delete_skips_recalculation(self):
+        self._assert_no_totals_update(self.order.delete)
+
+    def test_order_queryset_delete_skips_recalculation(self):
+        self._assert_no_totals_update(Order.objects.filter(pk=self.order.pk).delete)
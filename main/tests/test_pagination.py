@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from django.test import TestCase
+
+from main.models import Product
+from main.pagination import decode_cursor, paginate_catalog
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # много совпадений по featured_score / is_featured / created_at — порядок решает id
+        moments = [datetime(2026, 1, day, tzinfo=timezone.utc) for day in (1, 1, 2)]
+        for index in range(30):
+            product = Product.objects.create(
+                title=f'Laptop {index}',
+                price=1000,
+                featured_score=float(index % 3),
+                is_featured=index % 4 == 0,
+                is_available=index != 7,
+            )
+            Product.objects.filter(pk=product.pk).update(created_at=moments[index % 3])
+
+    def test_pages_cover_catalog_without_gaps_or_duplicates(self):
+        queryset = Product.objects.filter(is_available=True)
+        expected = list(queryset.order_by('-featured_score', '-is_featured', '-created_at', 'id').values_list('id', flat=True))
+
+        seen, cursor = [], None
+        while True:
+            page = paginate_catalog(queryset, cursor, page_size=4)
+            seen.extend(product.id for product in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 29)
+
+    def test_broken_cursor_starts_from_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page = paginate_catalog(Product.objects.filter(is_available=True), 'not-a-cursor', page_size=4)
+        self.assertEqual(len(page), 4)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from main.models import JobWatermark, Order, OrderItem, Product
+from main.ranking import SETTLE_TIME, WATERMARK, WINDOW_WATERMARK, rank_products
+
+
+class RankProductsTests(TestCase):
+    def setUp(self):
+        self.laptop = Product.objects.create(title='Laptop', price=1000, stock=5)
+        self.mouse = Product.objects.create(title='Mouse', price=100, stock=5)
+        self.order = Order.objects.create(full_name='Test', phone='1')
+        OrderItem.objects.create(order=self.order, product=self.mouse, quantity=1, price=100)
+        self._settle(self.order)
+        self.assertEqual(rank_products().mode, 'full')
+
+    def _settle(self, order, age=SETTLE_TIME * 2):
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - age)
+
+    def _score(self, product):
+        product.refresh_from_db()
+        return product.featured_score
+
+    def test_incremental_rescores_changed_inputs(self):
+        # правка мимо сигналов (update, импорт) — продаж нет, но оценка должна измениться
+        before = self._score(self.laptop)
+        Product.objects.filter(pk=self.laptop.pk).update(is_featured=True)
+        result = rank_products()
+        self.assertEqual((result.mode, result.scanned, result.changed), ('incremental', 1, 1))
+        self.assertGreater(self._score(self.laptop), before)
+        self.assertEqual(rank_products().scanned, 0)
+
+    def test_new_product_is_scored_incrementally(self):
+        tablet = Product.objects.create(title='Tablet', price=500, stock=5)
+        rank_products()
+        self.assertGreater(self._score(tablet), 0)
+
+    def test_watermark_waits_for_settle_time(self):
+        order = Order.objects.create(full_name='Fresh', phone='2')
+        item = OrderItem.objects.create(order=order, product=self.laptop, quantity=1, price=1000)
+        before = self._score(self.laptop)
+        rank_products()
+        self.assertLess(JobWatermark.read(WATERMARK), item.id)
+        self.assertEqual(self._score(self.laptop), before)
+
+        self._settle(order)
+        rank_products()
+        self.assertEqual(JobWatermark.read(WATERMARK), item.id)
+        self.assertGreater(self._score(self.laptop), before)
+
+    def test_sales_leaving_window_are_rescored(self):
+        before = self._score(self.mouse)
+        # прошлый прогон был 40 дней назад, с тех пор заказ выпал из 30-дневного окна
+        JobWatermark.advance(WINDOW_WATERMARK, int((timezone.now() - timedelta(days=70)).timestamp()))
+        self._settle(self.order, age=timedelta(days=35))
+        rank_products()
+        self.assertLess(self._score(self.mouse), before)
+
+
+class RankProductsWithoutOrdersTests(TestCase):
+    def test_incremental_without_orders(self):
+        laptop = Product.objects.create(title='Laptop', price=1000, stock=5)
+        self.assertEqual(rank_products().mode, 'full')
+        result = rank_products()
+        self.assertEqual((result.mode, result.scanned), ('incremental', 0))
+        Product.objects.filter(pk=laptop.pk).update(stock=0)
+        self.assertEqual(rank_products().changed, 1)
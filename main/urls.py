@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('products/', views.products, name='products'),
+    path('products/more/', views.products_more, name='products_more'),
     path('product/<int:pk>/', views.product_detail, name='product_detail'),
 
     path('cart/', views.cart_view, name='cart'),
@@ -15,6 +16,7 @@ urlpatterns = [
     path('about/', views.about, name='about'),
     path('faq/', views.faq, name='faq'),
     path('buy-now/<int:product_id>/', views.buy_now, name='buy_now'),
+    path('feed.<str:fmt>', views.feed, name='feed'),
 
 
 ]
@@ -1,117 +1,188 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import os
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.template.defaultfilters import floatformat
+
+from django.conf import settings
+from django.db import router, transaction
+
+from .models import Product
+from .caching import acatalog_version, aget_featured_products, cache_anonymous_page, catalog_version
+from .cart import get_cart
+from .checkout import OutOfStock, place_order
+from .copurchase import bought_together, cart_cross_sells
+from .facets import afacet_groups, filter_products, parse_filters
+from .feeds import FEED_CONTENT_TYPES, FEED_WRITERS, aiterate, feed_path, read_feed_file, stream_feed
+from .images import aload_local_images
+from .pagination import KeysetPage, apaginate_catalog
+from .search import search_product_ids
 
-from .models import (
-    Product,
-    CartItem,
-    Order,
-    OrderItem
-)
+# =====================
+# ASYNC-РЕНДЕР
+# =====================
+# Страницы каталога и корзина — async-вьюхи: под ASGI (см. DEPLOY.md) медленный
+# клиент не держит поток. Данные читаются async-ORM до рендера, а шаблон
+# рендерится в цикле событий и сам в БД не ходит: счётчик корзины в шапке
+# и таблица локальных картинок загружаются заранее.
+async def _arender(request, template_name, context):
+    await get_cart(request).acount()
+    await aload_local_images()
+    return render(request, template_name, context)
 
 # =====================
 # ГЛАВНАЯ СТРАНИЦА
 # =====================
-def index(request):
-    featured_products = Product.objects.filter(is_available=True).order_by('-featured_score','-is_featured','-created_at')[:6]
-    return render(request, 'main/index.html', {
-        'featured_products': featured_products
+@cache_anonymous_page
+async def index(request):
+    # блок "Лучшие товары" кешируется фрагментом; сам список лежит в кеше по версии каталога
+    return await _arender(request, 'main/index.html', {
+        'featured_products': await aget_featured_products(),
+        'catalog_version': await acatalog_version()
     })
 
 # =====================
 # СТРАНИЦА ТОВАРОВ
 # =====================
-def products(request):
-    products = Product.objects.filter(is_available=True)
-    return render(request, 'main/products.html', {
-        'products': products
+async def _catalog_page(request, selected, price_min, price_max):
+    queryset = filter_products(
+        Product.objects.filter(is_available=True),
+        selected, price_min, price_max
+    )
+
+    # поиск: одна страница лучших совпадений в порядке релевантности
+    query = request.GET.get('q', '').strip()
+    if query:
+        # сырой SQL FTS — синхронный курсор, уводим в поток
+        ids = await sync_to_async(search_product_ids)(
+            query, limit=settings.SEARCH_RESULTS_LIMIT, using=router.db_for_read(Product)
+        )
+        rank = {pk: position for position, pk in enumerate(ids)}
+        found = [product async for product in queryset.filter(id__in=ids)]
+        found.sort(key=lambda product: rank[product.id])
+        return KeysetPage(found, None)
+
+    return await apaginate_catalog(
+        queryset,
+        cursor=request.GET.get('after'),
+        page_size=settings.CATALOG_PAGE_SIZE,
+    )
+
+def _filter_query(request):
+    # текущие фильтры без курсора — для ссылки "Показать ещё"
+    params = request.GET.copy()
+    params.pop('after', None)
+    return params.urlencode()
+
+@cache_anonymous_page
+async def products(request):
+    selected, price_min, price_max = parse_filters(request.GET)
+    page = await _catalog_page(request, selected, price_min, price_max)
+    return await _arender(request, 'main/products.html', {
+        'products': page,
+        'page': page,
+        'facet_groups': await afacet_groups(selected),
+        'price_min': price_min,
+        'price_max': price_max,
+        'query': request.GET.get('q', ''),
+        'filter_query': _filter_query(request),
+        'has_filters': bool(selected) or price_min is not None or price_max is not None or bool(request.GET.get('q'))
+    })
+
+# "Показать ещё": только карточки следующей страницы, курсор — в заголовке
+async def products_more(request):
+    page = await _catalog_page(request, *parse_filters(request.GET))
+    response = await _arender(request, 'main/includes/product_cards.html', {
+        'products': page
     })
+    if page.next_cursor:
+        response['X-Next-Cursor'] = page.next_cursor
+    return response
 
 # =====================
 # ДЕТАЛИ ТОВАРА
 # =====================
-def product_detail(request, pk):
-    product = get_object_or_404(Product, pk=pk)
-    return render(request, 'main/product_detail.html', {
-        'product': product
+@cache_anonymous_page
+async def product_detail(request, pk):
+    product = await aget_object_or_404(Product.objects.prefetch_related('images'), pk=pk)
+    # похожие — заранее посчитанные соседи (main/similarity.py), один запрос по индексу
+    similar_products = [
+        similar async for similar in Product.objects
+        .filter(similar_entries__product_id=pk, is_available=True)
+        .order_by('similar_entries__rank')
+    ]
+    return await _arender(request, 'main/product_detail.html', {
+        'product': product,
+        'similar_products': similar_products,
+        'bought_together': [companion async for companion in bought_together(pk)],
     })
 
 # =====================
 # КОРЗИНА
 # =====================
-def cart_view(request):
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-
-    cart_items = CartItem.objects.filter(session_key=session_key)
-    cart_total = sum(item.get_total_price() for item in cart_items)
-
-    return render(request, 'main/cart.html', {
-        'cart_items': cart_items,
-        'cart_total': cart_total
+async def cart_view(request):
+    summary = await get_cart(request).asummary()
+    product_ids = [item.product.id for item in summary.items]
+
+    return await _arender(request, 'main/cart.html', {
+        'cart_items': summary.items,
+        'cart_total': summary.total,
+        'cross_sells': [product async for product in cart_cross_sells(product_ids)] if product_ids else [],
     })
 
-def add_to_cart(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-
-    item, created = CartItem.objects.get_or_create(
-        session_key=session_key,
-        product=product,
-        defaults={'quantity': 1}
+# Изменения корзины: обычная форма получает редирект на корзину, а fetch из
+# main/js/cart.js (заголовок X-Requested-With) — JSON с новой строкой и итогами,
+# и страница обновляет числа на месте без повторного рендера всей корзины.
+def _wants_json(request):
+    return (
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('Accept', '')
     )
 
-    if not created:
-        item.quantity += 1
-        item.save()
+def _cart_response(request, cart, item_id=None, product_id=None):
+    if not _wants_json(request):
+        return cart.finish(redirect('cart'))
+    summary = cart.summary()
+    line = next((
+        item for item in summary.items
+        if item.id == item_id or item.product.id == product_id
+    ), None)
+    # суммы уже в формате шаблона (floatformat:2 с локалью запроса)
+    return cart.finish(JsonResponse({
+        'item': line.id if line else item_id,
+        'quantity': line.quantity if line else 0,
+        'line_total': floatformat(line.line_total if line else 0, 2),
+        'cart_total': floatformat(summary.total, 2),
+        'count': summary.count,
+    }))
 
-    return redirect('cart')
+def add_to_cart(request, product_id):
+    product = get_object_or_404(Product, id=product_id)
+    cart = get_cart(request)
+    cart.add(product)
+    return _cart_response(request, cart, product_id=product.id)
 
 def remove_from_cart(request, item_id):
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-
-    item = get_object_or_404(
-        CartItem,
-        id=item_id,
-        session_key=session_key
-    )
-    item.delete()
-    return redirect('cart')
+    cart = get_cart(request)
+    cart.remove(item_id)
+    return _cart_response(request, cart, item_id=item_id)
 
 def update_quantity(request, item_id, action):
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-
-    item = get_object_or_404(
-        CartItem,
-        id=item_id,
-        session_key=session_key
-    )
-
-    if action == 'increase':
-        item.quantity += 1
-        item.save()
-    elif action == 'decrease' and item.quantity > 1:
-        item.quantity -= 1
-        item.save()
-
-    return redirect('cart')
+    cart = get_cart(request)
+    cart.update(item_id, action)
+    return _cart_response(request, cart, item_id=item_id)
 
 # =====================
 # ОФОРМЛЕНИЕ ЗАКАЗА
 # =====================
 def checkout_view(request):
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-
-    cart_items = CartItem.objects.filter(session_key=session_key)
+    cart = get_cart(request)
+    summary = cart.summary()
+    cart_items = summary.items
 
-    if not cart_items.exists():
+    if not cart_items:
         return redirect('cart')
 
     if request.method == 'POST':
@@ -121,47 +192,50 @@ def checkout_view(request):
         if not full_name or not phone:
             return render(request, 'main/checkout.html', {
                 'cart_items': cart_items,
+                'cart_total': summary.total,
                 'error': 'Заполните все поля'
             })
 
-        # 🔥 СОЗДАЁМ ЗАКАЗ (без пользователя)
-        order = Order.objects.create(
-            full_name=full_name,
-            phone=phone
-        )
-
-        # 🔥 СОХРАНЯЕМ КАЖДЫЙ ТОВАР В ЗАКАЗ
+        # 🔥 СОЗДАЁМ ЗАКАЗ ОДНОЙ ТРАНЗАКЦИЕЙ (склад + позиции)
+        lines = []
         for item in cart_items:
-            quantity = int(
-                request.POST.get(
-                    f'quantity_{item.id}',
-                    item.quantity
-                )
-            )
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                quantity=quantity
-            )
-
-        # ❌ ОЧИЩАЕМ КОРЗИНУ
-        cart_items.delete()
-
-        return render(request, 'main/checkout.html', {
+            try:
+                quantity = int(request.POST.get(f'quantity_{item.id}', item.quantity))
+            except ValueError:
+                quantity = item.quantity
+            lines.append((item.product, max(quantity, 1)))
+
+        try:
+            with transaction.atomic():
+                place_order(full_name, phone, lines)
+
+                # ❌ ОЧИЩАЕМ КОРЗИНУ (в той же транзакции, что и заказ)
+                cart.clear()
+        except OutOfStock as e:
+            return render(request, 'main/checkout.html', {
+                'cart_items': cart_items,
+                'cart_total': summary.total,
+                'error': str(e)
+            })
+
+        return cart.finish(render(request, 'main/checkout.html', {
             'success': True,
             'cart_items': []
-        })
+        }))
 
     return render(request, 'main/checkout.html', {
-        'cart_items': cart_items
+        'cart_items': cart_items,
+        'cart_total': summary.total
     })
 
 # =====================
 # СТАТИЧЕСКИЕ СТРАНИЦЫ
 # =====================
+@cache_anonymous_page
 def about(request):
     return render(request, 'main/about.html')
 
+@cache_anonymous_page
 def faq(request):
     return render(request, 'main/faq.html')
 def buy_now(request, product_id):
@@ -182,12 +256,43 @@ def buy_now(request, product_id):
                 'error': 'Заполните все поля'
             })
 
-        order = Order.objects.create(full_name=full_name, phone=phone)
-        OrderItem.objects.create(order=order, product=product, quantity=1)
+        try:
+            order = place_order(full_name, phone, [(product, 1)])
+        except OutOfStock as e:
+            return render(request, 'main/buy_now.html', {
+                'product': product,
+                'error': str(e)
+            })
 
         # Render same page with success message
         return render(request, 'main/buy_now.html', {
             'product': product,
             'success': True,
             'order': order
-        })
\ No newline at end of file
+        })
+
+# =====================
+# ФИДЫ ДЛЯ АГРЕГАТОРОВ
+# =====================
+def feed(request, fmt):
+    if fmt not in FEED_WRITERS:
+        raise Http404
+    # обычно фид текущей версии уже лежит на диске; иначе выгружаем потоком и сохраняем
+    version = catalog_version()
+    try:
+        fh = open(feed_path(fmt, version), 'rb')
+    except FileNotFoundError:
+        fh = None
+
+    if isinstance(request, ASGIRequest):
+        # под ASGI только async-итератор идёт клиенту кусками (см. main.feeds.aiterate)
+        chunks = read_feed_file(fh) if fh else stream_feed(fmt, version)
+        response = StreamingHttpResponse(aiterate(chunks), content_type=FEED_CONTENT_TYPES[fmt])
+        if fh:
+            response['Content-Length'] = os.fstat(fh.fileno()).st_size
+    elif fh:
+        response = FileResponse(fh, content_type=FEED_CONTENT_TYPES[fmt])
+    else:
+        response = StreamingHttpResponse(stream_feed(fmt, version), content_type=FEED_CONTENT_TYPES[fmt])
+    response['X-Feed-Version'] = version
+    return response